@@ -11,10 +11,18 @@ import logging
 import sys
 import time
 import random
+import argparse
+import datetime
 import ctypes
 sys.path.append('../TangoWidgetsQt5')
 import striptool
 from TangoDeviceClient import TangoDeviceClient
+from polling_device_client import PollingDeviceClient
+from data_hub import HUB_ADDRESS
+from spectrum_tools import SpectrumDecimator, WavelengthAxisCache, spectrum_peak
+from waterfall_widget import SpectrumWaterfall
+from strip_chart import StripChart
+from attribute_snapshot import AttributeSnapshot
 from ColorDefinitions import QTangoSizes
 from SliderCompositeWidgets import QTangoAttributeSlider
 from SpectrumCompositeWidgets import QTangoReadAttributeSpectrum
@@ -33,18 +41,24 @@ logger.setLevel(logging.INFO)
 # logger.propagate = False
 
 
-class TestDeviceClient(TangoDeviceClient):
+class TestDeviceClient(PollingDeviceClient):
     """ Example device client using the test laser finesse and redpitaya5.
 
     """
-    def __init__(self):
-        TangoDeviceClient.__init__(self, "Astrella Overview", use_sidebar=False, use_bottombar=False, call_setup_layout=False)
+    def __init__(self, hub_address=None, spectrum_analysis=False, recorder_path=None, replay_path=None, replay_speed=1.0,
+                 replay_start=None, sim_address=None):
+        PollingDeviceClient.__init__(self, "Astrella Overview", use_sidebar=False, use_bottombar=False, call_setup_layout=False,
+                                     batch_reads=True, use_events=True, hub_address=hub_address,
+                                     recorder_path=recorder_path, replay_path=replay_path, replay_speed=replay_speed,
+                                     replay_start=replay_start, sim_address=sim_address)
 
         self.logger.setLevel(logging.INFO)
 
         self.fund_enabled_data = False
         self.harm_enabled_data = False
         self.wavelengths = None
+        # Compute central wavelength and bandwidth from the spectrum instead of polling them
+        self.spectrum_analysis = spectrum_analysis
 
         self.title_sizes = QTangoSizes()
         self.title_sizes.barHeight = 30
@@ -86,8 +100,8 @@ class TestDeviceClient(TangoDeviceClient):
         self.verdi_commands.addCmdButton("Rem Disable", self.verdi_rem_disable, pos=5)
         # self.verdi_commands.addCmdButton("Open", self.verdi_open)
         # self.verdi_commands.addCmdButton("Close", self.verdi_close)
-        self.add_attribute("state", "verdi", self.verdi_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "verdi", self.verdi_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("verdi", self.verdi_commands.setState, self.verdi_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.verdi_commands])
 
 
         # Revolution setup
@@ -117,8 +131,8 @@ class TestDeviceClient(TangoDeviceClient):
         self.revolution_commands.addCmdButton("On", self.revolution_on)
         self.revolution_commands.addCmdButton("Off", self.revolution_off)
         self.revolution_commands.addCmdButton("Go OP", self.revolution_operating)
-        self.add_attribute("state", "revolution", self.revolution_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "revolution", self.revolution_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("revolution", self.revolution_commands.setState, self.revolution_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.revolution_commands])
 
         # Vitara setup
         #
@@ -128,42 +142,48 @@ class TestDeviceClient(TangoDeviceClient):
         self.vitara_power_slider.setSliderLimits(0, 700)
         self.add_attribute("pd_power", "vitara", self.read_vitara_power, update_interval=0.3, single_shot=False,
                            get_info=True, attr_info_slot=self.vitara_power_slider.configureAttribute)
-        self.add_attribute("modelock_status", "vitara", self.read_vitara_modelock, update_interval=0.5, single_shot=False,
-                           get_info=False)
         self.vitara_modelock_label = QTangoReadAttributeBoolean("Modelock", self.attr_sizes, self.colors)
+        self.add_attribute("modelock_status", "vitara", self.read_vitara_modelock, update_interval=0.5, single_shot=False,
+                           get_info=False, consumers=[self.vitara_modelock_label])
         self.vitara_rasterizing_label = QTangoReadAttributeBoolean("Rasterizing", self.attr_sizes, self.colors)
         self.add_attribute("rasterizing_status", "vitara", self.read_vitara_rasterizing, update_interval=1.0, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.vitara_rasterizing_label])
 
         self.vitara_commands = QTangoCommandSelection("Vitara", self.attr_sizes, self.colors, multiline_status=True)
         self.vitara_commands.addCmdButton("Go OP", self.vitara_goto_operating)
         self.vitara_commands.addCmdButton("Go KS", self.vitara_goto_kickstart)
         self.vitara_commands.addCmdButton("Starter", self.vitara_start_starter)
         # self.vitara_commands.addCmdButton("Stop starter", self.vitara_stop_starter)
-        self.add_attribute("state", "vitara", self.vitara_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "vitara", self.vitara_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("vitara", self.vitara_commands.setState, self.vitara_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.vitara_commands])
 
         # self.add_attribute("power", "vitara", self.read_vitara_power, update_interval=0.3, single_shot=False,
         #                    get_info=True, attr_info_slot=self.verdi_power_slider.configureAttribute)
         self.add_device("oscillator_spectrometer", "astrella/oscillator/spectrometer")
         self.vitara_l0_slider = QTangoAttributeSlider(u"Central \u03bb", self.attr_sizes, self.colors, show_write_widget=False, slider_style=4)
         self.vitara_l0_slider.setSliderLimits(700, 790)
-        self.add_attribute("peakwavelength", "oscillator_spectrometer", self.read_peakwavelength, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.vitara_l0_slider.configureAttribute)
+        self.add_attribute("peakwavelength", "oscillator_spectrometer", self.read_peakwavelength, update_interval=0.5,
+                           single_shot=spectrum_analysis, get_info=True, attr_info_slot=self.vitara_l0_slider.configureAttribute)
 
         self.vitara_dl_slider = QTangoAttributeSlider("Bandwidth", self.attr_sizes, self.colors, show_write_widget=False, slider_style=4)
         self.vitara_dl_slider.setSliderLimits(0, 60)
-        self.add_attribute("peakwidth", "oscillator_spectrometer", self.read_peakwidth, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.vitara_dl_slider.configureAttribute)
+        self.add_attribute("peakwidth", "oscillator_spectrometer", self.read_peakwidth, update_interval=0.5,
+                           single_shot=spectrum_analysis, get_info=True, attr_info_slot=self.vitara_dl_slider.configureAttribute)
 
         self.vitara_spectrum = QTangoReadAttributeSpectrum("Bandwidth", self.attr_sizes, self.colors)
         self.vitara_spectrum.setXRange(700, 850)
+        self.spectrum_decimator = SpectrumDecimator((700, 850))
         # self.vitara_spectrum.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Minimum)
         self.vitara_spectrum.setMaximumHeight(self.attr_sizes.readAttributeHeight)
+        self.vitara_waterfall = SpectrumWaterfall((700, 850), n_rows=200)
+        self.vitara_waterfall.setMaximumHeight(self.attr_sizes.readAttributeHeight)
         self.add_attribute("spectrum", "oscillator_spectrometer", self.read_spectrum, update_interval=0.5,
                            single_shot=False, get_info=True, attr_info_slot=self.vitara_spectrum.configureAttribute)
-        self.add_attribute("wavelengths", "oscillator_spectrometer", self.read_wavelengths, update_interval=0.5,
-                           single_shot=True, get_info=False)
+        # The axis is read again when a spectrum of another length or a config event arrives
+        self.wavelength_axis = WavelengthAxisCache(self.fetch_wavelengths)
+        self.wavelength_axis.request()
+        for attr_name in ["wavelengths", "spectrum"]:
+            self.add_config_listener(attr_name, "oscillator_spectrometer", self.spectrometer_config_changed)
 
         # SDG setup
         #
@@ -171,8 +191,8 @@ class TestDeviceClient(TangoDeviceClient):
         self.sdg_commands = QTangoCommandSelection("Delay generator", self.attr_sizes, self.colors, multiline_status=True)
         self.sdg_commands.addCmdButton("Init", self.sdg_init)
         self.sdg_commands.addCmdButton("Reset", self.sdg_reset)
-        self.add_attribute("state", "sdg", self.sdg_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "sdg", self.sdg_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("sdg", self.sdg_commands.setState, self.sdg_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.sdg_commands])
 
         # Synchrolock setup
         #
@@ -181,18 +201,19 @@ class TestDeviceClient(TangoDeviceClient):
         self.slap_commands.addCmdButton("Init", self.slap_init)
         self.slap_commands.addCmdButton("Fund", self.slap_fund)
         self.slap_commands.addCmdButton("Harm", self.slap_harm)
-        self.add_attribute("state", "slap", self.slap_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "slap", self.slap_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("slap", self.slap_commands.setState, self.slap_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.slap_commands])
         # Separate slap gui? There is quite a lot to adjust.
         self.slap_fund_enabled_label = QTangoReadAttributeBoolean("Fund enabled", self.attr_sizes, self.colors)
         self.add_attribute("fund_enabled", "slap", self.read_slap_fund_enabled, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.slap_fund_enabled_label, self.slap_commands])
         self.slap_harm_enabled_label = QTangoReadAttributeBoolean("Harm enabled", self.attr_sizes, self.colors)
         self.add_attribute("harm_enabled", "slap", self.read_slap_harm_enabled, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.slap_harm_enabled_label, self.slap_commands])
         self.slap_ferr_label = QTangoReadAttributeDouble("Error freq", self.attr_sizes, self.colors)
         self.add_attribute("error_frequency_abs", "slap", self.read_slap_ferr, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.slap_ferr_label.configureAttribute)
+                           get_info=True, attr_info_slot=self.slap_ferr_label.configureAttribute,
+                           display_format="%d")
         self.slap_ferr_label.valueSpinbox.setDataFormat("%d")
 
         self.slap_fund_error_slider = QTangoAttributeSlider("Fund error", self.attr_sizes, self.colors, show_write_widget=False, slider_style=4)
@@ -205,7 +226,8 @@ class TestDeviceClient(TangoDeviceClient):
                            get_info=True, attr_info_slot=self.slap_harm_error_slider.configureAttribute)
         self.slap_picomotor_edit = QTangoWriteAttributeDouble("Picomotor", self.attr_sizes, self.colors)
         self.add_attribute("picomotor_pos", "slap", self.read_slap_picomotor, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.slap_picomotor_edit.configureAttribute)
+                           get_info=True, attr_info_slot=self.slap_picomotor_edit.configureAttribute,
+                           display_format="%d")
         self.slap_picomotor_edit.writeValueLineEdit.newValueSignal.connect(self.write_slap_picomotor)
         self.slap_picomotor_edit.valueSpinbox.setDataFormat("%d")
         self.slap_picomotor_edit.writeValueLineEdit.setDataFormat("%d")
@@ -214,13 +236,15 @@ class TestDeviceClient(TangoDeviceClient):
         self.slap_fund_phase_edit.valueSpinbox.setDataFormat("%d")
         self.slap_fund_phase_edit.writeValueLineEdit.setDataFormat("%d")
         self.add_attribute("fund_phase_shift", "slap", self.read_slap_fund_phase, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.slap_fund_phase_edit.configureAttribute)
+                           get_info=True, attr_info_slot=self.slap_fund_phase_edit.configureAttribute,
+                           display_format="%d")
         self.slap_harm_phase_edit = QTangoWriteAttributeDouble("Harm phase", self.attr_sizes, self.colors)
         self.slap_harm_phase_edit.writeValueLineEdit.newValueSignal.connect(self.write_slap_harm_phase)
         self.slap_harm_phase_edit.valueSpinbox.setDataFormat("%d")
         self.slap_harm_phase_edit.writeValueLineEdit.setDataFormat("%d")
         self.add_attribute("harm_phase_shift", "slap", self.read_slap_harm_phase, update_interval=0.5, single_shot=False,
-                           get_info=True, attr_info_slot=self.slap_harm_phase_edit.configureAttribute)
+                           get_info=True, attr_info_slot=self.slap_harm_phase_edit.configureAttribute,
+                           display_format="%d")
 
 
         # Astrella setup
@@ -248,8 +272,8 @@ class TestDeviceClient(TangoDeviceClient):
         self.shutter_commands = QTangoCommandSelection("Shutter", self.attr_sizes, self.colors, multiline_status=True)
         self.shutter_commands.addCmdButton("Open", self.shutter_open)
         self.shutter_commands.addCmdButton("Close", self.shutter_close)
-        self.add_attribute("state", "shutter", self.shutter_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "shutter", self.shutter_status, update_interval=1.0, single_shot=False)
+        self.add_state_status("shutter", self.shutter_commands.setState, self.shutter_commands.setStatusText,
+                              update_interval=0.3, status_interval=1.0, consumers=[self.shutter_commands])
 
         # Set up layout
         #
@@ -340,6 +364,7 @@ class TestDeviceClient(TangoDeviceClient):
         self.right_layout_1.addWidget(self.vitara_l0_slider)
         self.right_layout_1.addWidget(self.vitara_dl_slider)
         self.right_layout_1.addWidget(self.vitara_spectrum)
+        self.right_layout_1.addWidget(self.vitara_waterfall)
         h_spacer_2 = QtWidgets.QSpacerItem(10, 0, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         # self.right_layout_1.addWidget(self.ir_energy_slider)
         # self.right_layout_1.addWidget(self.uv_energy_slider)
@@ -363,6 +388,10 @@ class TestDeviceClient(TangoDeviceClient):
 
         self.status_layout.addWidget(self.sdg_commands)
         self.status_layout.addWidget(self.shutter_commands)
+        self.history_button = QtWidgets.QPushButton("History")
+        self.history_button.clicked.connect(self.show_history)
+        self.status_layout.addWidget(self.history_button)
+        self.strip_chart = None
         v_spacer_status = QtWidgets.QSpacerItem(10, 0, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.status_layout.addSpacerItem(v_spacer_status)
 
@@ -420,12 +449,6 @@ class TestDeviceClient(TangoDeviceClient):
     def verdi_close(self):
         self.devices["verdi"].command_inout_asynch("close_shutter", None, True)
 
-    def verdi_status(self, data):
-        if data.name == "Status":
-            self.verdi_commands.setStatusText(data.value)
-        else:
-            self.verdi_commands.setState(data)
-
     def read_vitara_power(self, data):
         logger.debug("In read_vitara_power: {0}".format(data.value))
         self.vitara_power_slider.setAttributeValue(data)
@@ -437,12 +460,6 @@ class TestDeviceClient(TangoDeviceClient):
     def read_vitara_rasterizing(self, data):
         self.vitara_rasterizing_label.setAttributeValue(data)
 
-    def vitara_status(self, data):
-        if data.name == "Status":
-            self.vitara_commands.setStatusText(data.value)
-        else:
-            self.vitara_commands.setState(data)
-
     def vitara_goto_operating(self):
         self.devices["vitara"].command_inout_asynch("goto_operating_pos", None, True)
 
@@ -484,24 +501,12 @@ class TestDeviceClient(TangoDeviceClient):
     def revolution_operating(self):
         self.devices["revolution"].command_inout_asynch("set_operating", None, True)
 
-    def revolution_status(self, data):
-        if data.name == "Status":
-            self.revolution_commands.setStatusText(data.value)
-        else:
-            self.revolution_commands.setState(data)
-
     def sdg_init(self):
         self.devices["sdg"].command_inout_asynch("init", None, True)
 
     def sdg_reset(self):
         self.devices["sdg"].command_inout_asynch("reset", None, True)
 
-    def sdg_status(self, data):
-        if data.name == "Status":
-            self.sdg_commands.setStatusText(data.value)
-        else:
-            self.sdg_commands.setState(data)
-
     def slap_init(self):
         self.devices["slap"].command_inout_asynch("init", None, True)
 
@@ -517,12 +522,6 @@ class TestDeviceClient(TangoDeviceClient):
         else:
             self.devices["slap"].write_attribute("harm_enabled", True)
 
-    def slap_status(self, data):
-        if data.name == "Status":
-            self.slap_commands.setStatusText(data.value)
-        else:
-            self.slap_commands.setState(data)
-
     def read_slap_fund_enabled(self, data):
         self.slap_fund_enabled_label.setAttributeValue(data)
         self.fund_enabled_data = data.value
@@ -585,21 +584,53 @@ class TestDeviceClient(TangoDeviceClient):
         self.vitara_dl_slider.setAttributeValue(data)
 
     def read_spectrum(self, data):
-        if self.wavelengths is not None:
-            self.vitara_spectrum.setSpectrum(self.wavelengths, data)
+        if self.wavelength_axis.accept(data):
+            self.show_spectrum(data)
+
+    def show_spectrum(self, data):
+        if self.spectrum_analysis:
+            self.analyse_spectrum(data)
+        self.vitara_waterfall.add_spectrum(self.wavelengths, data.value)
+        self.spectrum_decimator.set_width(self.vitara_spectrum.width())
+        x, data.value = self.spectrum_decimator.decimate(data.value)
+        self.vitara_spectrum.setSpectrum(x, data)
+
+    def analyse_spectrum(self, data):
+        centroid, fwhm = spectrum_peak(self.wavelengths, data.value)
+        if centroid is None:
+            return
+        for name, value, slider in (("PeakWavelength", centroid, self.vitara_l0_slider),
+                                    ("PeakWidth", fwhm, self.vitara_dl_slider)):
+            slider.setAttributeValue(AttributeSnapshot(name=name, value=value, w_value=None, quality=data.quality,
+                                                       time=data.time, has_failed=False, is_empty=False))
+
+    def fetch_wavelengths(self):
+        self.add_attribute("wavelengths", "oscillator_spectrometer", self.read_wavelengths, single_shot=True,
+                           get_info=False)
 
     def read_wavelengths(self, data):
-        self.wavelengths = data.value
+        if self.wavelength_axis.set_axis(data.value):
+            logger.info("New wavelength axis, {0} points".format(len(data.value)))
+            self.wavelengths = self.wavelength_axis.axis
+            self.spectrum_decimator.set_x(self.wavelengths)
+        for spectrum_data in self.wavelength_axis.take_pending():
+            self.show_spectrum(spectrum_data)
+
+    def spectrometer_config_changed(self, info):
+        self.wavelength_axis.request()
+
+    def show_history(self):
+        if self.strip_chart is None:
+            # Separate window that is closed together with the main window
+            self.strip_chart = StripChart(self.history, parent=self)
+            self.strip_chart.setWindowFlags(QtCore.Qt.Window)
+            self.strip_chart.resize(800, 400)
+        self.strip_chart.show()
+        self.strip_chart.raise_()
 
     def cmd_done(self, data):
         print("Command done. Returned:\n{0}".format(data))
 
-    def shutter_status(self, data):
-        if data.name == "Status":
-            self.shutter_commands.setStatusText(data.value)
-        else:
-            self.shutter_commands.setState(data)
-
     def shutter_open(self):
         self.devices["shutter"].command_inout_asynch("open_shutter", None, True)
 
@@ -608,9 +639,21 @@ class TestDeviceClient(TangoDeviceClient):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hub", action="store_true", help="Read attributes from the local data hub")
+    parser.add_argument("--record", metavar="DIR", help="Record all attribute updates to DIR")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recording (directory or day directory) "
+                                                         "instead of connecting to the devices")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible")
+    parser.add_argument("--start", help="Replay start time, e.g. \"2026-10-17 14:30\"")
+    parser.add_argument("--sim", metavar="HOST:PORT", nargs="?", const="localhost:45450",
+                        help="Connect to the simulated devices of simulated_devices.py")
+    parser.add_argument("--spectrum-analysis", action="store_true",
+                        help="Compute central wavelength and bandwidth from the spectrum instead of polling them")
+    args, qt_args = parser.parse_known_args()
     myappid = 'mycompany.myproduct.subproduct.version'  # arbitrary string
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
-    app = QtWidgets.QApplication(sys.argv)
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
 
     pic_list = ["estrella2_rs.png", "estrella_beer_2.png", "estrella_damm.png"]
     random.seed(time.time_ns())
@@ -629,7 +672,11 @@ if __name__ == "__main__":
     splash.showMessage('Starting GUI\n\n\n', alignment=int(QtCore.Qt.AlignBottom) | int(QtCore.Qt.AlignHCenter),
                        color=QtGui.QColor('#000000'))
     app.processEvents()
-    myapp = TestDeviceClient()
+    replay_start = datetime.datetime.fromisoformat(args.start).timestamp() if args.start else None
+    myapp = TestDeviceClient(hub_address=HUB_ADDRESS if args.hub else None, spectrum_analysis=args.spectrum_analysis,
+                             recorder_path=args.record,
+                             replay_path=args.replay, replay_speed=args.speed,
+                             replay_start=replay_start, sim_address=args.sim)
     myapp.setWindowIcon(QtGui.QIcon("estrella_beer_2.png"))
     myapp.show()
     splash.finish(myapp)
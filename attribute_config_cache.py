@@ -0,0 +1,109 @@
+"""
+On-disk cache of attribute configurations.
+
+Configurations (unit, format, limits, ...) are stored as AttributeSnapshots keyed on device
+name and attribute name, so that a GUI can configure its widgets directly at startup and
+check the configurations against the devices later in the background.
+
+Changes are saved save_delay s after the first change, so that the configurations arriving
+together at startup are written in one save. Saves are serialised and go through a unique
+temporary file, and entries saved by another GUI in the meantime are kept.
+
+:created: 2026-10-17
+"""
+
+import threading
+import tempfile
+import logging
+import pickle
+import os
+from attribute_snapshot import snapshot
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = os.path.join(os.path.expanduser("~"), ".astrella_gui", "attribute_config_cache.pkl")
+
+
+class AttributeConfigCache(object):
+    """ Attribute configurations keyed on (device name, attribute name), saved to filename.
+
+    """
+    def __init__(self, filename=CACHE_FILENAME, save_delay=1.0):
+        self.filename = filename
+        self.save_delay = save_delay
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.save_timer = None
+        self.configs = dict()
+        self.load()
+
+    @staticmethod
+    def _key(device_name, attr_name):
+        return device_name.lower(), attr_name.lower()
+
+    def load(self):
+        try:
+            with open(self.filename, "rb") as f:
+                configs = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Could not load attribute config cache {0}: {1}".format(self.filename, e))
+            return
+        with self.lock:
+            self.configs = configs
+        logger.debug("Loaded {0} attribute configs from {1}".format(len(configs), self.filename))
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                self.save_timer = None
+                configs = dict(self.configs)
+            try:
+                with open(self.filename, "rb") as f:
+                    # Keep what other GUIs have saved, our own entries are newer
+                    saved = pickle.load(f)
+                saved.update(configs)
+                configs = saved
+            except Exception:
+                pass
+            try:
+                path = os.path.dirname(self.filename)
+                os.makedirs(path, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(dir=path, prefix=os.path.basename(self.filename), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        pickle.dump(configs, f)
+                    os.replace(tmp_name, self.filename)
+                except OSError:
+                    os.remove(tmp_name)
+                    raise
+            except OSError as e:
+                logger.warning("Could not save attribute config cache {0}: {1}".format(self.filename, e))
+
+    def _schedule_save(self):
+        with self.lock:
+            if self.save_timer is not None:
+                return
+            self.save_timer = threading.Timer(self.save_delay, self.save)
+            self.save_timer.daemon = True
+        self.save_timer.start()
+
+    def get(self, device_name, attr_name):
+        with self.lock:
+            return self.configs.get(self._key(device_name, attr_name))
+
+    def update(self, device_name, attr_name, info):
+        """ Store the configuration info. Returns True if it differs from the cached one.
+
+        The cache file is written save_delay s later when something changed.
+        """
+        info_snapshot = snapshot(info)
+        key = self._key(device_name, attr_name)
+        with self.lock:
+            changed = self.configs.get(key) != info_snapshot
+            if changed:
+                self.configs[key] = info_snapshot
+        if changed:
+            self._schedule_save()
+        return changed
@@ -0,0 +1,125 @@
+"""
+Change and periodic event subscriptions for the device client GUIs.
+
+Attributes are subscribed to change events first, then periodic events. If the device server
+does not push events for an attribute the fallback callable is invoked so that the attribute
+can be handed over to the poller instead.
+
+Subscriptions can also be made for attribute config events, then the callback gets the new
+attribute configuration.
+
+:created: 2026-10-17
+"""
+
+import threading
+import logging
+import queue
+import tango as pt
+
+logger = logging.getLogger(__name__)
+
+
+class EventSubscription(object):
+    """ Event subscription of one attribute on one device.
+
+    """
+    def __init__(self, device_name, proxy, attr_name, callback, fallback=None, max_period=None, event_types=None):
+        if event_types is None:
+            event_types = [pt.EventType.CHANGE_EVENT, pt.EventType.PERIODIC_EVENT]
+        self.event_types = event_types
+        self.device_name = device_name
+        self.proxy = proxy
+        self.name = attr_name
+        self.callback = callback
+        self.fallback = fallback
+        # Longest accepted periodic event period in s. Slower periodic events are treated as no events.
+        self.max_period = max_period
+        self.event_id = None
+        self.event_type = None
+        self.active = True
+
+    def subscribe(self):
+        """ Try the event types in order (change events, then periodic events by default).
+        Returns True if a subscription was made.
+
+        """
+        for event_type in self.event_types:
+            if event_type == pt.EventType.PERIODIC_EVENT and not self._periodic_fast_enough():
+                continue
+            try:
+                self.event_id = self.proxy.subscribe_event(self.name, event_type, self.push_event, [], False)
+            except pt.DevFailed as e:
+                logger.debug("No {0} for {1}/{2}: {3}".format(event_type, self.device_name, self.name,
+                                                             e.args[0].reason))
+                continue
+            self.event_type = event_type
+            logger.info("Subscribed to {0} for {1}/{2}".format(event_type, self.device_name, self.name))
+            return True
+        return False
+
+    def _periodic_fast_enough(self):
+        if self.max_period is None:
+            return True
+        try:
+            period = float(self.proxy.get_attribute_config(self.name).events.per_event.period) * 1e-3
+        except (pt.DevFailed, ValueError):
+            return False
+        return period <= self.max_period
+
+    def push_event(self, event):
+        if not self.active:
+            return
+        if event.err:
+            logger.debug("Event error for {0}/{1}: {2}".format(self.device_name, self.name, event.errors[0].desc))
+            return
+        # Attribute config events carry attr_conf instead of attr_value
+        value = event.attr_value if hasattr(event, "attr_value") else event.attr_conf
+        if value is not None:
+            self.callback(value)
+
+    def unsubscribe(self):
+        self.active = False
+        if self.event_id is not None:
+            try:
+                self.proxy.unsubscribe_event(self.event_id)
+            except pt.DevFailed:
+                pass
+            self.event_id = None
+
+
+class AttributeEventManager(object):
+    """ Makes event subscriptions in a background thread so that the GUI thread is not blocked by
+    the subscription round trips. Subscriptions that fail call their fallback.
+
+    """
+    def __init__(self):
+        self.subscriptions = list()
+        self.request_queue = queue.Queue()
+        self.thread = threading.Thread(target=self._subscribe_loop, name="event_subscriber")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def subscribe(self, device_name, proxy, attr_name, callback, fallback=None, max_period=None, event_types=None):
+        sub = EventSubscription(device_name, proxy, attr_name, callback, fallback, max_period, event_types)
+        self.subscriptions.append(sub)
+        self.request_queue.put(sub)
+        return sub
+
+    def _subscribe_loop(self):
+        while True:
+            sub = self.request_queue.get()
+            if sub is None:
+                break
+            if not sub.active:
+                continue
+            if not sub.subscribe():
+                if sub.fallback is not None:
+                    logger.info("No events for {0}/{1}, polling instead".format(sub.device_name, sub.name))
+                    sub.fallback()
+                else:
+                    logger.info("No events for {0}/{1}".format(sub.device_name, sub.name))
+
+    def stop(self):
+        self.request_queue.put(None)
+        for sub in self.subscriptions:
+            sub.unsubscribe()
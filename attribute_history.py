@@ -0,0 +1,184 @@
+"""
+History of scalar attribute values for strip charts.
+
+Each attribute gets a RingBuffer of fixed capacity with timestamp and value float64 arrays.
+Samples are written twice, at index i and i + capacity, so that the latest samples always
+form one contiguous slice of the arrays and can be read without reordering. Memory is fixed
+when the buffer is created and no Python objects are kept per sample.
+
+Next to the raw samples each attribute has levels of min/max/mean buckets, each level factor
+times coarser than the one below. A query for a long time span is answered from the finest
+level that gives at most max_points points, so a plot of a day draws a few thousand points
+while a zoomed in plot still shows the raw samples.
+
+:created: 2026-10-17
+"""
+
+import threading
+import numbers
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer(object):
+    """ Last capacity samples of a timestamp and columns values.
+
+    """
+    def __init__(self, capacity=20000, columns=1):
+        self.capacity = capacity
+        self.t = np.zeros(2 * capacity, dtype=np.float64)
+        self.v = np.zeros((2 * capacity, columns), dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+    def append(self, t, *values):
+        i = self.index
+        self.t[i] = t
+        self.t[i + self.capacity] = t
+        self.v[i] = values
+        self.v[i + self.capacity] = values
+        self.index = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def full(self):
+        return self.count == self.capacity
+
+    def first_time(self):
+        if self.count == 0:
+            return None
+        return self.t[self.index + self.capacity - self.count]
+
+    def get(self, since=None, until=None):
+        """ Returns timestamp and value arrays of the samples between since and until, oldest
+        first. The arrays are views into the buffer, copy them if they are kept.
+
+        """
+        stop = self.index + self.capacity
+        start = stop - self.count
+        if since is not None:
+            start += np.searchsorted(self.t[start:stop], since, side="left")
+        if until is not None:
+            stop = start + np.searchsorted(self.t[start:stop], until, side="right")
+        return self.t[start:stop], self.v[start:stop]
+
+
+class MultiResolutionBuffer(object):
+    """ Raw samples of one attribute and levels of (min, max, mean) buckets.
+
+    Level k (from 1) has buckets of factor**k raw samples, timestamped with their first sample.
+
+    :param capacity: Number of samples or buckets kept in each level
+    :param levels: Number of bucket levels
+    :param factor: Number of samples of the level below in each bucket
+    """
+    def __init__(self, capacity=20000, levels=3, factor=10):
+        self.raw = RingBuffer(capacity)
+        self.levels = [RingBuffer(capacity, 3) for k in range(levels)]
+        self.bucket_sizes = [factor ** (k + 1) for k in range(levels)]
+        # Bucket being filled in each level: first time, count, min, max, sum
+        self.acc_t = [0.0] * levels
+        self.acc_n = [0] * levels
+        self.acc_min = [0.0] * levels
+        self.acc_max = [0.0] * levels
+        self.acc_sum = [0.0] * levels
+
+    def append(self, t, v):
+        self.raw.append(t, v)
+        for k in range(len(self.levels)):
+            if self.acc_n[k] == 0:
+                self.acc_t[k] = t
+                self.acc_min[k] = v
+                self.acc_max[k] = v
+                self.acc_sum[k] = v
+            else:
+                self.acc_min[k] = min(self.acc_min[k], v)
+                self.acc_max[k] = max(self.acc_max[k], v)
+                self.acc_sum[k] += v
+            self.acc_n[k] += 1
+            if self.acc_n[k] == self.bucket_sizes[k]:
+                self.levels[k].append(self.acc_t[k], self.acc_min[k], self.acc_max[k],
+                                      self.acc_sum[k] / self.acc_n[k])
+                self.acc_n[k] = 0
+
+    def get(self, since=None, until=None, max_points=None):
+        """ Returns timestamp and value arrays (copies) between since and until.
+
+        Raw samples are returned if they reach back to since and are at most max_points.
+        Otherwise the finest level that does is used, returned as interleaved min and max
+        points so that spikes stay visible, followed by the raw samples of the bucket that is
+        still being filled.
+        """
+        t, v = self.raw.get(since, until)
+        if len(self.levels) == 0 or (self._covers(self.raw, since) and
+                                     (max_points is None or t.shape[0] <= max_points)):
+            return t.copy(), v[:, 0].copy()
+        for k, level in enumerate(self.levels):
+            t, v = level.get(since, until)
+            if (self._covers(level, since) and (max_points is None or 2 * t.shape[0] <= max_points)) \
+                    or k == len(self.levels) - 1:
+                break
+        t_out = np.repeat(t, 2)
+        v_out = v[:, :2].ravel()
+        if self.acc_n[k] > 0 and (until is None or until >= self.acc_t[k]):
+            t_tail, v_tail = self.raw.get(self.acc_t[k], until)
+            t_out = np.concatenate((t_out, t_tail))
+            v_out = np.concatenate((v_out, v_tail[:, 0]))
+        return t_out, v_out
+
+    @staticmethod
+    def _covers(buf, since):
+        if not buf.full():
+            return True
+        return since is not None and buf.first_time() <= since
+
+
+class AttributeHistory(object):
+    """ History buffers of all recorded scalar attributes, keyed on "device path/attr_name".
+
+    :param capacity: Samples kept per attribute and level
+    :param levels: Number of downsampled levels
+    :param factor: Downsampling factor between levels
+    """
+    def __init__(self, capacity=20000, levels=3, factor=10):
+        self.capacity = capacity
+        self.levels = levels
+        self.factor = factor
+        self.buffers = dict()
+        self.lock = threading.Lock()
+
+    def record(self, key, data):
+        """ Record the value of a DeviceAttribute. Values that are not real scalars are ignored.
+
+        """
+        value = data.value
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return
+        try:
+            t = data.time.totime()
+        except AttributeError:
+            t = time.time()
+        with self.lock:
+            buf = self.buffers.get(key)
+            if buf is None:
+                buf = MultiResolutionBuffer(self.capacity, self.levels, self.factor)
+                self.buffers[key] = buf
+            buf.append(t, float(value))
+
+    def keys(self):
+        with self.lock:
+            return sorted(self.buffers.keys())
+
+    def get(self, key, since=None, until=None, max_points=None):
+        """ Returns copies of the timestamp and value arrays of key between since and until,
+        downsampled to about max_points points (see MultiResolutionBuffer.get).
+
+        """
+        with self.lock:
+            buf = self.buffers.get(key)
+            if buf is None:
+                return np.zeros(0), np.zeros(0)
+            return buf.get(since, until, max_points)
@@ -0,0 +1,420 @@
+"""
+Batched attribute polling for the device client GUIs.
+
+One scheduler thread keeps all registered attributes in a heap keyed on due time. Attributes of
+the same device that are due at the same tick are read with a single read_attributes call in a
+worker thread and the results are fanned out to the per-attribute callbacks.
+
+There is at most one outstanding read per device. Attributes that become due while a read is
+running wait for it to finish and are then read together. The round trip time of each device
+is measured and the poll intervals of slow devices are stretched until they recover.
+
+Devices that stop responding are handled by a circuit breaker (see device_health.py). While the
+breaker is open the device only gets one probe read per backoff period, so that it does not tie
+up the worker threads used by the healthy devices.
+
+Devices can be added before their proxy exists (proxy=None). Attributes of such a device wait
+until set_device_proxy is called, so that device connections can be made in the background.
+
+Attribute configurations (get_info=True) of a device are fetched together with one
+get_attribute_config_ex call for all pending requests when the next batch of the device is read.
+
+:created: 2026-10-17
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import itertools
+import logging
+import random
+import heapq
+import time
+import tango as pt
+from device_health import DeviceHealth, OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class PollEntry(object):
+    """ One attribute registration in the poller.
+
+    due_count is the number of times the attribute became due, late_count the number of times it
+    was dispatched more than late_tolerance after its due time and skipped_count the number of
+    update intervals that were skipped because a read was still running.
+
+    """
+    def __init__(self, device_name, name, interval, callback, single_shot=False, get_info=False,
+                 info_callback=None):
+        self.device_name = device_name
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.single_shot = single_shot
+        self.get_info = get_info
+        self.info_callback = info_callback
+        self.next_due = 0.0
+        self.info_after = 0.0
+        self.active = True
+        self.visible = True
+        self.due_count = 0
+        self.late_count = 0
+        self.skipped_count = 0
+
+
+class DevicePoller(object):
+    """ Reads batches of attributes from one device.
+
+    All attributes of the device are scheduled relative to the same epoch, so attributes with
+    different intervals still line up and can be read together. The epoch is offset by a random
+    phase so that the devices are not all read in the same millisecond.
+
+    rtt is a running average of the read round trip time. Poll intervals shorter than
+    rtt_factor * rtt are stretched to that value.
+
+    """
+    def __init__(self, device_name, proxy, epoch, rtt_factor=2.0, rtt_alpha=0.2):
+        self.device_name = device_name
+        self.proxy = proxy
+        self.epoch = epoch
+        self.rtt_factor = rtt_factor
+        self.rtt_alpha = rtt_alpha
+        self.read_count = 0
+        self.busy = False
+        self.waiting = list()
+        self.info_pending = list()
+        self.rtt = None
+        self.rtt_max = 0.0
+        self.stretched = False
+        self.health = DeviceHealth(device_name)
+
+    def interval_for(self, interval):
+        if self.rtt is None:
+            return interval
+        return max(interval, self.rtt_factor * self.rtt)
+
+    def update_rtt(self, rtt, min_interval):
+        """ Add a round trip time. min_interval is the shortest interval of the polled attributes
+        of the device (None if there are none), the stretched flag is set against it.
+
+        """
+        if self.rtt is None:
+            self.rtt = rtt
+        else:
+            self.rtt = self.rtt_alpha * rtt + (1 - self.rtt_alpha) * self.rtt
+        self.rtt_max = max(self.rtt_max, rtt)
+        if min_interval is None:
+            return
+        stretched = self.rtt_factor * self.rtt > min_interval
+        if stretched != self.stretched:
+            self.stretched = stretched
+            if stretched:
+                logger.info("{0} is slow, round trip {1:.0f} ms. Stretching poll interval to {2:.0f} ms".format(
+                    self.device_name, 1e3 * self.rtt, 1e3 * self.interval_for(min_interval)))
+            else:
+                logger.info("{0} recovered, round trip {1:.0f} ms".format(self.device_name, 1e3 * self.rtt))
+
+    def first_due(self, interval, now):
+        if now <= self.epoch:
+            return self.epoch
+        n = int((now - self.epoch) / interval) + 1
+        return self.epoch + n * interval
+
+    def fetch_configs(self, entries):
+        """ Fetch the attribute configs of entries in one call and pass them to the info callbacks.
+        Returns the entries that should be retried, and whether the device responded (None if
+        there was nothing to fetch).
+
+        """
+        if len(entries) == 0:
+            return list(), None
+        names = list()
+        for entry in entries:
+            if entry.name not in names:
+                names.append(entry.name)
+        try:
+            configs = dict(zip(names, self.proxy.get_attribute_config_ex(names)))
+        except pt.DevFailed as e:
+            if e.args[0].reason != "API_AttrNotFound":
+                logger.debug("Config read of {0} on {1} failed: {2}".format(names, self.device_name, e.args[0].desc))
+                return entries, False
+            # One unknown attribute fails the whole query, fetch the rest one by one
+            configs = dict()
+            for name in names:
+                try:
+                    configs[name] = self.proxy.get_attribute_config(name)
+                except pt.DevFailed as e:
+                    logger.warning("Could not read config for {0}/{1}: {2}".format(self.device_name, name,
+                                                                                  e.args[0].desc))
+        for entry in entries:
+            entry.get_info = False
+            if entry.name in configs and entry.info_callback is not None:
+                entry.info_callback(configs[entry.name])
+        return list(), True
+
+    def read_batch(self, entries):
+        """ Read the attributes of entries and call their callbacks. Returns False if the device
+        did not respond, None if there was nothing to read.
+
+        """
+        # Entries without callback only fetch the attribute config
+        entries = [e for e in entries if e.callback is not None]
+        if len(entries) == 0:
+            return None
+        names = list()
+        for entry in entries:
+            if entry.name not in names:
+                names.append(entry.name)
+        try:
+            # Spectra and images as NumPy arrays, not lists
+            results = self.proxy.read_attributes(names, extract_as=pt.ExtractAs.Numpy)
+        except pt.DevFailed as e:
+            logger.debug("Read of {0} on {1} failed: {2}".format(names, self.device_name, e.args[0].desc))
+            return False
+        self.read_count += 1
+        for entry in entries:
+            data = results[names.index(entry.name)]
+            if data.has_failed:
+                logger.debug("Attribute {0}/{1} read failed".format(self.device_name, entry.name))
+                continue
+            entry.callback(data)
+        return True
+
+
+class AttributePoller(object):
+    """ Single scheduler for all polled attributes of all devices.
+
+    :param tick: Attributes of a device due within this time of each other are read together
+    :param max_workers: Number of threads doing the device reads
+    :param jitter: Maximum random start phase of each device
+    :param late_tolerance: Dispatch delay after which an attribute read is counted as late
+    :param health_callback: Called as health_callback(device_name, state) from a worker thread when
+                            the health state of a device changes
+    """
+    def __init__(self, tick=0.05, max_workers=8, jitter=0.5, late_tolerance=0.05, health_callback=None):
+        self.tick = tick
+        self.health_callback = health_callback
+        self.jitter = jitter
+        self.late_tolerance = late_tolerance
+        self.paused = False
+        self.stop_flag = False
+        self.device_pollers = dict()
+        self.entries = list()
+        self.heap = list()
+        self.parked = list()
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poll")
+        self.thread = threading.Thread(target=self._schedule_loop, name="poll_scheduler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add_device(self, device_name, proxy=None):
+        with self.condition:
+            if device_name not in self.device_pollers:
+                epoch = time.monotonic() + random.uniform(0, self.jitter)
+                self.device_pollers[device_name] = DevicePoller(device_name, proxy, epoch)
+            return self.device_pollers[device_name]
+
+    def set_device_proxy(self, device_name, proxy):
+        """ Set the proxy of a device that was added without one, and read the attributes that
+        have been waiting for it.
+
+        """
+        with self.condition:
+            device_poller = self.device_pollers[device_name]
+            device_poller.proxy = proxy
+            if device_poller.health.state == OPEN:
+                self._defer_waiting(device_poller)
+            if not device_poller.busy and len(device_poller.waiting) > 0:
+                waiting = device_poller.waiting
+                device_poller.waiting = list()
+                device_poller.busy = True
+                self._submit(device_poller, waiting)
+
+    def add_attribute(self, device_name, attr_name, callback, interval=0.5, single_shot=False, get_info=False,
+                      info_callback=None, delay=0.0):
+        """ Poll attr_name on device_name every interval s, starting after delay s. With callback None
+        only the attribute config is fetched (single_shot and get_info should be set).
+
+        """
+        entry = PollEntry(device_name, attr_name, interval, callback, single_shot, get_info, info_callback)
+        with self.condition:
+            device_poller = self.device_pollers[device_name]
+            if single_shot:
+                entry.next_due = time.monotonic() + delay
+            else:
+                entry.next_due = device_poller.first_due(interval, time.monotonic() + delay)
+            if get_info:
+                entry.info_after = time.monotonic() + delay
+                device_poller.info_pending.append(entry)
+            self.entries.append(entry)
+            self._push(entry)
+        return entry
+
+    def remove_attribute(self, device_name, entry):
+        with self.condition:
+            entry.active = False
+            if entry in self.entries:
+                self.entries.remove(entry)
+
+    def set_attribute_visible(self, device_name, entry, visible):
+        """ Invisible attributes are not read until they are made visible again.
+
+        """
+        with self.condition:
+            entry.visible = visible
+            if visible and not self.paused and entry in self.parked:
+                self.parked.remove(entry)
+                entry.next_due = time.monotonic()
+                self._push(entry)
+
+    def set_paused(self, paused):
+        with self.condition:
+            self.paused = paused
+            if not paused:
+                # Refresh everything directly when the window is shown again
+                now = time.monotonic()
+                for entry in [e for e in self.parked if e.visible]:
+                    self.parked.remove(entry)
+                    entry.next_due = now
+                    self._push(entry)
+
+    def get_statistics(self):
+        """ Per attribute scheduling counters, keyed on device_name/attr_name.
+
+        """
+        with self.condition:
+            return {"{0}/{1}".format(e.device_name, e.name): {"interval": e.interval, "due": e.due_count,
+                                                              "late": e.late_count, "skipped": e.skipped_count}
+                    for e in self.entries}
+
+    def get_device_statistics(self):
+        """ Round trip times (s) and read counts per device.
+
+        """
+        with self.condition:
+            return {name: {"rtt": dp.rtt, "rtt_max": dp.rtt_max, "reads": dp.read_count, "stretched": dp.stretched,
+                           "health": dp.health.state}
+                    for name, dp in self.device_pollers.items()}
+
+    def stop(self):
+        with self.condition:
+            self.stop_flag = True
+            self.condition.notify()
+        self.executor.shutdown(wait=False)
+
+    def _push(self, entry):
+        heapq.heappush(self.heap, (entry.next_due, next(self.counter), entry))
+        self.condition.notify()
+
+    def _schedule_loop(self):
+        with self.condition:
+            while not self.stop_flag:
+                now = time.monotonic()
+                batches = dict()
+                while len(self.heap) > 0 and self.heap[0][0] <= now + self.tick:
+                    due, seq, entry = heapq.heappop(self.heap)
+                    if not entry.active:
+                        continue
+                    if self.paused or not entry.visible:
+                        self.parked.append(entry)
+                        continue
+                    health = self.device_pollers[entry.device_name].health
+                    if health.state == OPEN and due < health.next_probe:
+                        # Read all attributes of an open device together in the next probe
+                        entry.next_due = health.next_probe
+                        self._push(entry)
+                        continue
+                    entry.due_count += 1
+                    if now - due > self.late_tolerance:
+                        entry.late_count += 1
+                    batches.setdefault(entry.device_name, list()).append(entry)
+                for device_name, entries in batches.items():
+                    device_poller = self.device_pollers[device_name]
+                    if device_poller.busy or device_poller.proxy is None:
+                        # Only one read per device at a time. Read these when the current one is done
+                        # or when the device is connected.
+                        device_poller.waiting.extend(entries)
+                    else:
+                        device_poller.busy = True
+                        self._submit(device_poller, entries)
+                if len(self.heap) > 0:
+                    self.condition.wait(max(0.0, self.heap[0][0] - time.monotonic()))
+                else:
+                    self.condition.wait()
+
+    def _submit(self, device_poller, entries):
+        try:
+            self.executor.submit(self._run_batch, device_poller, entries)
+        except RuntimeError:
+            # Executor already shut down at exit
+            self.stop_flag = True
+
+    def _defer_waiting(self, device_poller):
+        """ Put the entries waiting for an open device back in the heap, due at the next probe.
+
+        """
+        for entry in device_poller.waiting:
+            entry.next_due = max(entry.next_due, device_poller.health.next_probe)
+            self._push(entry)
+        device_poller.waiting = list()
+
+    def _run_batch(self, device_poller, entries):
+        t0 = time.monotonic()
+        with self.condition:
+            # All config requests of the device that are ready, not only those of this batch
+            info_entries = [e for e in device_poller.info_pending if e.info_after <= t0]
+            device_poller.info_pending = [e for e in device_poller.info_pending
+                                          if e.info_after > t0 and e.active]
+        retry_info = info_entries
+        # Result of each device call: True if it succeeded, False if it failed
+        calls = list()
+        try:
+            retry_info, configs_read = device_poller.fetch_configs([e for e in info_entries if e.active])
+            calls.append(configs_read)
+            calls.append(device_poller.read_batch(entries))
+        except Exception:
+            logger.exception("Error reading {0}".format(device_poller.device_name))
+            calls.append(False)
+        calls = [c for c in calls if c is not None]
+        responded = any(calls)
+        now = time.monotonic()
+        health_changed = False
+        with self.condition:
+            device_poller.info_pending.extend(retry_info)
+            if responded:
+                # Against all attributes of the device, not only this batch, so that batches with
+                # different intervals do not toggle the stretched flag
+                min_interval = min((e.interval for e in self.entries
+                                    if e.device_name == device_poller.device_name and not e.single_shot),
+                                   default=None)
+                device_poller.update_rtt(now - t0, min_interval)
+                health_changed = device_poller.health.record_success()
+            elif len(calls) > 0:
+                health_changed = device_poller.health.record_failure(now)
+            if device_poller.health.state == OPEN:
+                # Only one probe read per backoff, not one per waiting group of attributes
+                self._defer_waiting(device_poller)
+            if len(device_poller.waiting) > 0:
+                waiting = device_poller.waiting
+                device_poller.waiting = list()
+                self._submit(device_poller, waiting)
+            else:
+                device_poller.busy = False
+            for entry in entries:
+                if entry.single_shot or not entry.active:
+                    if entry in self.entries:
+                        self.entries.remove(entry)
+                    continue
+                interval = device_poller.interval_for(entry.interval)
+                entry.next_due += interval
+                if entry.next_due < now:
+                    # The read overran the interval. Skip the missed ticks instead of bursting.
+                    missed = int((now - entry.next_due) / interval) + 1
+                    entry.skipped_count += missed
+                    entry.next_due += missed * interval
+                if device_poller.health.state == OPEN:
+                    entry.next_due = max(entry.next_due, device_poller.health.next_probe)
+                self._push(entry)
+        if health_changed and self.health_callback is not None:
+            self.health_callback(device_poller.device_name, device_poller.health.state)
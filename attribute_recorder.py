@@ -0,0 +1,309 @@
+"""
+Append-only binary recording of all attribute updates.
+
+Recordings are stored in one directory per day (YYYY-MM-DD, local time) containing:
+
+    records.bin   Fixed width records of RECORD_DTYPE, no header. The file can be opened with
+                  np.memmap(filename, dtype=RECORD_DTYPE, mode="r").
+    blobs.bin     Variable length data: spectra as packed little endian float32 arrays and
+                  strings as utf-8. Records point into it with offset and length (bytes).
+    catalog.json  Record format version, record dtype and the attribute names. The attr field
+                  of a record is an index into the attribute list.
+
+Updates are queued by the GUI thread and written by a writer thread in chunks once per
+flush_interval, so the file writes do not block the GUI. Spectra of an attribute are recorded
+at most once per spectrum_interval s to bound the write rate. Each new day starts with the
+latest value of every attribute, so that a day directory can be replayed on its own. Days are
+rotated on the wall clock of the writer, not on the device timestamps, so updates from devices
+with skewed clocks do not switch back and forth between two day directories at midnight.
+
+A recorder holds an exclusive lock on recording.lock in the recording directory, so that only
+one process at a time can record to it.
+
+RecordingDay reads the recording of one day back.
+
+:created: 2026-10-17
+"""
+
+import threading
+import numbers
+import logging
+import queue
+import json
+import time
+import os
+import numpy as np
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+RECORD_VERSION = 1
+
+RECORD_DTYPE = np.dtype([("time", "<f8"), ("attr", "<u2"), ("kind", "u1"), ("quality", "u1"),
+                         ("length", "<u4"), ("value", "<f8"), ("offset", "<u8")])
+
+KIND_NUMBER = 0
+KIND_BOOL = 1
+KIND_STATE = 2
+KIND_STRING = 3
+KIND_SPECTRUM = 4
+
+RECORDS_FILENAME = "records.bin"
+BLOBS_FILENAME = "blobs.bin"
+CATALOG_FILENAME = "catalog.json"
+LOCK_FILENAME = "recording.lock"
+
+
+def day_name(t):
+    return time.strftime("%Y-%m-%d", time.localtime(t))
+
+
+def lock_directory(path):
+    """ Take an exclusive lock on the recording directory path. Returns the open lock file, which
+    holds the lock until it is closed. Raises RuntimeError if another process holds it.
+
+    """
+    os.makedirs(path, exist_ok=True)
+    lock_file = open(os.path.join(path, LOCK_FILENAME), "a")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError("{0} is already being recorded to by another process".format(path))
+    return lock_file
+
+
+class DayFiles(object):
+    """ Open files of the recording of one day.
+
+    """
+    def __init__(self, path, day):
+        self.path = os.path.join(path, day)
+        self.day = day
+        os.makedirs(self.path, exist_ok=True)
+        self.catalog_name = os.path.join(self.path, CATALOG_FILENAME)
+        self.attributes = list()
+        if os.path.exists(self.catalog_name):
+            with open(self.catalog_name, "r") as f:
+                self.attributes = json.load(f)["attributes"]
+        self.indices = {name: i for i, name in enumerate(self.attributes)}
+        self.record_file = open(os.path.join(self.path, RECORDS_FILENAME), "ab")
+        self.blob_file = open(os.path.join(self.path, BLOBS_FILENAME), "ab")
+        self.blob_offset = self.blob_file.tell()
+
+    def attr_index(self, name):
+        index = self.indices.get(name)
+        if index is None:
+            index = len(self.attributes)
+            self.attributes.append(name)
+            self.indices[name] = index
+            self.write_catalog()
+        return index
+
+    def write_catalog(self):
+        catalog = {"version": RECORD_VERSION, "record_dtype": RECORD_DTYPE.descr, "attributes": self.attributes}
+        tmp_name = self.catalog_name + ".tmp"
+        with open(tmp_name, "w") as f:
+            json.dump(catalog, f, indent=1)
+        os.replace(tmp_name, self.catalog_name)
+
+    def write_blob(self, data):
+        offset = self.blob_offset
+        self.blob_file.write(data)
+        self.blob_offset += len(data)
+        return offset
+
+    def close(self):
+        self.record_file.close()
+        self.blob_file.close()
+
+
+class AttributeRecorder(object):
+    """ Records attribute updates in path (see module docstring for the format).
+
+    :param path: Directory of the day directories
+    :param flush_interval: Time (s) between writes to the files
+    :param spectrum_interval: Shortest time (s) between two recorded spectra of an attribute
+    :param max_queue: Updates queued before new ones are dropped
+    :param chunk_size: Records collected in memory before they are written
+    """
+    def __init__(self, path, flush_interval=1.0, spectrum_interval=1.0, max_queue=100000, chunk_size=4096):
+        self.path = path
+        self.lock_file = lock_directory(path)
+        self.flush_interval = flush_interval
+        self.spectrum_interval = spectrum_interval
+        self.queue = queue.Queue(max_queue)
+        self.chunk = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self.chunk_count = 0
+        self.files = None
+        self.last_spectrum = dict()
+        self.last_values = dict()
+        self.recorded_count = 0
+        self.dropped_count = 0
+        self.thread = threading.Thread(target=self._write_loop, name="recorder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, name, data):
+        """ Queue an update of attribute name. Called from the GUI thread.
+
+        The value object is kept as it is, so arrays should not be changed in place afterwards.
+        """
+        value = data.value
+        try:
+            t = data.time.totime()
+        except AttributeError:
+            t = time.time()
+        if hasattr(value, "__len__") and not isinstance(value, str):
+            if t - self.last_spectrum.get(name, 0.0) < self.spectrum_interval:
+                return
+            self.last_spectrum[name] = t
+        quality = getattr(data, "quality", None)
+        try:
+            self.queue.put_nowait((name, t, value, int(quality) if quality is not None else 0))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5.0)
+        self.lock_file.close()
+
+    def _write_loop(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            if item:
+                try:
+                    self._add_record(*item)
+                except Exception:
+                    logger.exception("Could not record {0}".format(item[0]))
+            if time.monotonic() >= next_flush:
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+        self._flush()
+        if self.files is not None:
+            self.files.close()
+
+    def _open_day(self, day):
+        self._flush()
+        new_day = self.files is not None
+        if new_day:
+            self.files.close()
+        self.files = DayFiles(self.path, day)
+        logger.info("Recording to {0}".format(self.files.path))
+        if new_day:
+            for name, t, value, quality in list(self.last_values.values()):
+                self._add_record(name, t, value, quality, day)
+
+    def _add_record(self, name, t, value, quality, day=None):
+        if day is None:
+            day = day_name(time.time())
+        # Only roll forward, e.g. if the clock is set back
+        if self.files is None or self.files.day < day:
+            self._open_day(day)
+        self.last_values[name] = (name, t, value, quality)
+        if self.chunk_count == self.chunk.shape[0]:
+            self._flush()
+        rec = self.chunk[self.chunk_count]
+        rec["time"] = t
+        rec["attr"] = self.files.attr_index(name)
+        rec["quality"] = quality
+        rec["value"] = 0.0
+        rec["offset"] = 0
+        rec["length"] = 0
+        if isinstance(value, bool) or isinstance(value, np.bool_):
+            rec["kind"] = KIND_BOOL
+            rec["value"] = float(value)
+        elif isinstance(value, numbers.Real) and hasattr(type(value), "values"):
+            # Tango enums such as DevState
+            rec["kind"] = KIND_STATE
+            rec["value"] = int(value)
+        elif isinstance(value, numbers.Real):
+            rec["kind"] = KIND_NUMBER
+            rec["value"] = value
+        elif isinstance(value, str):
+            blob = value.encode("utf-8")
+            rec["kind"] = KIND_STRING
+            rec["offset"] = self.files.write_blob(blob)
+            rec["length"] = len(blob)
+        else:
+            blob = np.ascontiguousarray(value, dtype="<f4").tobytes()
+            rec["kind"] = KIND_SPECTRUM
+            rec["offset"] = self.files.write_blob(blob)
+            rec["length"] = len(blob)
+        self.chunk_count += 1
+        self.recorded_count += 1
+
+    def _flush(self):
+        if self.files is None or self.chunk_count == 0:
+            return
+        self.files.record_file.write(self.chunk[:self.chunk_count].tobytes())
+        self.files.record_file.flush()
+        self.files.blob_file.flush()
+        self.chunk_count = 0
+
+
+def day_directories(path):
+    """ Day directories of a recording, oldest first. path can be the recording directory or
+    one day directory.
+
+    """
+    if os.path.exists(os.path.join(path, CATALOG_FILENAME)):
+        return [path]
+    days = list()
+    for name in sorted(os.listdir(path)):
+        if os.path.exists(os.path.join(path, name, CATALOG_FILENAME)):
+            days.append(os.path.join(path, name))
+    return days
+
+
+class RecordingDay(object):
+    """ Read access to the recording of one day. The record and blob files are memory mapped.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, CATALOG_FILENAME), "r") as f:
+            catalog = json.load(f)
+        self.attributes = catalog["attributes"]
+        self.records = self._map(os.path.join(path, RECORDS_FILENAME), RECORD_DTYPE)
+        self.blobs = self._map(os.path.join(path, BLOBS_FILENAME), np.uint8)
+
+    @staticmethod
+    def _map(filename, dtype):
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        # Records may be partly written while recording
+        count = size // np.dtype(dtype).itemsize
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode="r", shape=(count,))
+
+    def value(self, rec):
+        """ Value of a record as read from the device: float, bool, int state, str or float32 array.
+
+        """
+        kind = rec["kind"]
+        if kind == KIND_NUMBER:
+            return float(rec["value"])
+        if kind == KIND_BOOL:
+            return bool(rec["value"])
+        if kind == KIND_STATE:
+            return int(rec["value"])
+        blob = self.blobs[int(rec["offset"]):int(rec["offset"]) + int(rec["length"])]
+        if kind == KIND_STRING:
+            return blob.tobytes().decode("utf-8")
+        return blob.view("<f4")
@@ -0,0 +1,106 @@
+"""
+Replay of a recording made with attribute_recorder.py.
+
+The records are read in time order and passed on as AttributeSnapshots with the same fields
+the widgets use from a DeviceAttribute (name, value, quality, time), paced to the recorded
+timestamps divided by speed. When replaying from a start time, the latest value of each
+attribute before the start is replayed first so that the widgets start out filled in. These
+are taken from the day of the start time, which begins with the latest value of every attribute,
+and the days before it are not read.
+
+:created: 2026-10-17
+"""
+
+import threading
+import logging
+import time
+import numpy as np
+import tango as pt
+from attribute_recorder import RecordingDay, day_directories, KIND_STATE
+from attribute_snapshot import AttributeSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class AttributeReplay(object):
+    """ Replays a recording in a background thread.
+
+    :param path: Recording directory or one day directory of it
+    :param callback: Called as callback(name, data) for every record, name is "device path/attr_name"
+    :param speed: Replay speed relative to real time. None or 0 replays as fast as possible.
+    :param start: Start time (s since epoch), None for the start of the recording
+    :param end: End time (s since epoch), None for the end of the recording
+    """
+    def __init__(self, path, callback, speed=1.0, start=None, end=None):
+        self.path = path
+        self.callback = callback
+        self.speed = speed
+        self.start_time = start
+        self.end_time = end
+        self.stop_flag = False
+        self.replayed_count = 0
+        self.thread = threading.Thread(target=self._replay_loop, name="replay")
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_flag = True
+
+    def _replay_loop(self):
+        days = day_directories(self.path)
+        if len(days) == 0:
+            logger.error("No recording found in {0}".format(self.path))
+            return
+        t_wall0 = None
+        t_rec0 = None
+        for day_path in days:
+            day = RecordingDay(day_path)
+            times = np.asarray(day.records["time"])
+            if times.shape[0] == 0 or (self.start_time is not None and times.max() < self.start_time):
+                # Each day starts with the latest value of every attribute, so the days before
+                # the start are not needed
+                continue
+            # Records are appended in arrival order, which can differ slightly from the timestamps
+            order = np.argsort(times, kind="stable")
+            first = 0
+            prestart = list()
+            if self.start_time is not None and t_wall0 is None:
+                first = int(np.searchsorted(times[order], self.start_time, side="left"))
+                # Latest record of each attribute before start, replayed when the start is reached
+                before = order[:first][::-1]
+                attrs = np.asarray(day.records["attr"][before])
+                latest = before[np.unique(attrs, return_index=True)[1]]
+                prestart = latest[np.argsort(times[latest], kind="stable")]
+            logger.info("Replaying {0}, {1} records".format(day_path, len(order) - first))
+            for i in order[first:]:
+                if self.stop_flag:
+                    return
+                rec = day.records[i]
+                t = float(rec["time"])
+                if self.end_time is not None and t > self.end_time:
+                    return
+                if t_wall0 is None:
+                    t_wall0 = time.monotonic()
+                    t_rec0 = t
+                    for j in prestart:
+                        self.callback(day.attributes[day.records[j]["attr"]], self._snapshot(day, day.records[j]))
+                if self.speed:
+                    delay = t_wall0 + (t - t_rec0) / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.callback(day.attributes[rec["attr"]], self._snapshot(day, rec))
+                self.replayed_count += 1
+        logger.info("Replay finished, {0} records".format(self.replayed_count))
+
+    @staticmethod
+    def _snapshot(day, rec):
+        name = day.attributes[rec["attr"]]
+        value = day.value(rec)
+        if rec["kind"] == KIND_STATE:
+            value = pt.DevState.values[value]
+        return AttributeSnapshot(name=name.split("/")[-1], value=value, w_value=None,
+                                 quality=pt.AttrQuality.values[int(rec["quality"])],
+                                 time=pt.TimeVal.fromtimestamp(float(rec["time"])),
+                                 has_failed=False, is_empty=False)
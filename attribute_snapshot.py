@@ -0,0 +1,111 @@
+"""
+Picklable copies of attribute readings and attribute configurations.
+
+DeviceAttribute and AttributeInfoEx objects can not be sent between processes or stored on
+disk directly. A snapshot copies the public fields into a plain object with the same attribute
+names, so that the widgets can use it in place of the original.
+
+:created: 2026-10-17
+"""
+
+import tango as pt
+
+
+class AttributeSnapshot(object):
+    """ Plain object with the public fields of a DeviceAttribute or AttributeInfoEx.
+
+    Tango enums and time values are stored as plain numbers when pickled and restored when
+    unpickled.
+
+    """
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __getstate__(self):
+        return {k: to_plain(v) for k, v in self.__dict__.items()}
+
+    def __setstate__(self, state):
+        self.__dict__.update({k: from_plain(v) for k, v in state.items()})
+
+    def __eq__(self, other):
+        if not isinstance(other, AttributeSnapshot):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return "AttributeSnapshot({0})".format(", ".join("{0}={1!r}".format(k, v) for k, v in self.__dict__.items()))
+
+
+def _is_tango_enum(obj):
+    return isinstance(obj, int) and hasattr(pt, type(obj).__name__) and hasattr(type(obj), "values")
+
+
+def _public_fields(obj):
+    fields = dict()
+    for k in dir(obj):
+        if k.startswith("_"):
+            continue
+        try:
+            v = getattr(obj, k)
+        except Exception:
+            continue
+        if callable(v) and not _is_tango_enum(v):
+            continue
+        fields[k] = v
+    return fields
+
+
+def snapshot(obj):
+    """ Copy the public fields of a Tango attribute object into an AttributeSnapshot.
+
+    Nested structures (alarms, events) are copied recursively.
+
+    """
+    if obj is None or isinstance(obj, AttributeSnapshot):
+        return obj
+    fields = dict()
+    for k, v in _public_fields(obj).items():
+        fields[k] = _copy_value(v)
+    return AttributeSnapshot(**fields)
+
+
+def _copy_value(v):
+    if v is None or isinstance(v, (bool, int, float, str, bytes)) or _is_tango_enum(v):
+        return v
+    if isinstance(v, pt.TimeVal):
+        return pt.TimeVal(v.tv_sec, v.tv_usec, v.tv_nsec)
+    if isinstance(v, (list, tuple)):
+        return type(v)(_copy_value(x) for x in v)
+    if hasattr(v, "dtype"):
+        # numpy array or scalar
+        return v
+    if type(v).__module__.startswith("tango"):
+        return snapshot(v)
+    return v
+
+
+def to_plain(v):
+    """ Convert a snapshot value into something that pickles without tango.
+
+    """
+    if _is_tango_enum(v):
+        return ("__enum__", type(v).__name__, int(v))
+    if isinstance(v, pt.TimeVal):
+        return ("__time__", v.totime())
+    if isinstance(v, list):
+        return [to_plain(x) for x in v]
+    if isinstance(v, tuple):
+        return tuple(to_plain(x) for x in v)
+    return v
+
+
+def from_plain(v):
+    if isinstance(v, tuple) and len(v) == 3 and v[0] == "__enum__":
+        return getattr(pt, v[1]).values[v[2]]
+    if isinstance(v, tuple) and len(v) == 2 and v[0] == "__time__":
+        return pt.TimeVal.fromtimestamp(v[1])
+    if isinstance(v, list):
+        return [from_plain(x) for x in v]
+    if isinstance(v, tuple):
+        return tuple(from_plain(x) for x in v)
+    return v
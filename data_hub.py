@@ -0,0 +1,348 @@
+"""
+Local data hub shared by the GUIs running on one computer.
+
+The hub owns the device connections used for reading and reads each attribute once, at the
+fastest interval any client has asked for. The latest values are published to all connected GUI
+clients. Commands and attribute writes still go directly from the GUIs to the devices. Start it
+with
+
+    python data_hub.py
+
+and start the GUIs with --hub.
+
+Connections are authenticated with a random key generated for the user on first use and stored
+in AUTHKEY_FILENAME, readable only by the user, so that other users on the computer can not
+connect to the hub.
+
+:created: 2026-10-17
+"""
+
+from multiprocessing.connection import Listener, Client
+import threading
+import argparse
+import logging
+import time
+import os
+import tango as pt
+from attribute_poller import AttributePoller
+from attribute_events import AttributeEventManager
+from attribute_snapshot import snapshot
+
+logger = logging.getLogger(__name__)
+
+HUB_ADDRESS = ("localhost", 45600)
+AUTHKEY_FILENAME = os.path.join(os.path.expanduser("~"), ".astrella_gui", "hub_authkey")
+
+
+def load_authkey(filename=AUTHKEY_FILENAME):
+    """ Returns the hub authentication key of the user, generating it if it does not exist.
+
+    """
+    os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(filename, "rb") as f:
+            return f.read()
+    key = os.urandom(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class HubClientConnection(object):
+    """ Connection from one GUI to the hub. Values are sent from a separate thread. If the GUI
+    is slow to read only the latest value of each attribute is kept.
+
+    """
+    def __init__(self, hub, conn, client_id):
+        self.hub = hub
+        self.conn = conn
+        self.client_id = client_id
+        self.pending = dict()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.send_thread = threading.Thread(target=self._send_loop, name="hub_send_{0}".format(client_id))
+        self.send_thread.daemon = True
+        self.recv_thread = threading.Thread(target=self._recv_loop, name="hub_recv_{0}".format(client_id))
+        self.recv_thread.daemon = True
+        self.send_thread.start()
+        self.recv_thread.start()
+
+    def publish(self, msg_type, key, data):
+        with self.condition:
+            self.pending[(msg_type, key)] = data
+            self.condition.notify()
+
+    def _send_loop(self):
+        while not self.closed:
+            with self.condition:
+                while len(self.pending) == 0 and not self.closed:
+                    self.condition.wait()
+                pending = self.pending
+                self.pending = dict()
+            try:
+                for (msg_type, key), data in pending.items():
+                    self.conn.send((msg_type, key[0], key[1], data))
+            except (OSError, EOFError):
+                self.close()
+
+    def _recv_loop(self):
+        while not self.closed:
+            try:
+                msg = self.conn.recv()
+            except (OSError, EOFError):
+                break
+            if msg[0] == "subscribe":
+                self.hub.subscribe(self, *msg[1:])
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        with self.condition:
+            self.condition.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.hub.remove_client(self)
+
+
+class HubAttribute(object):
+    """ Attribute read by the hub and the clients subscribed to it. interval is the fastest
+    interval asked for, None as long as all requests were single shot.
+
+    """
+    def __init__(self, device_path, name, interval):
+        self.device_path = device_path
+        self.name = name
+        self.interval = interval
+        self.clients = list()
+        self.entry = None
+        self.subscription = None
+        self.value = None
+        self.info = None
+
+
+class DataHub(object):
+    """ Reads attributes for any number of local clients and publishes the latest values.
+
+    Devices are connected in background threads, retrying until they respond, so that a device
+    that is down does not hold up the subscriptions of other devices. Reading of an attribute
+    starts when its device is connected.
+
+    """
+    def __init__(self, address=HUB_ADDRESS, authkey=None, use_events=True, retry_interval=10.0):
+        self.address = address
+        self.authkey = authkey if authkey is not None else load_authkey()
+        self.use_events = use_events
+        self.retry_interval = retry_interval
+        self.poller = AttributePoller()
+        self.event_manager = AttributeEventManager()
+        # Device path: proxy, None while connecting
+        self.devices = dict()
+        self.attributes = dict()
+        self.clients = list()
+        self.lock = threading.Lock()
+        self.client_count = 0
+
+    def serve_forever(self):
+        listener = Listener(self.address, authkey=self.authkey)
+        logger.info("Data hub listening on {0}".format(self.address))
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning("Client connection failed: {0}".format(e))
+                    continue
+                with self.lock:
+                    self.client_count += 1
+                    client = HubClientConnection(self, conn, self.client_count)
+                    self.clients.append(client)
+                logger.info("Client {0} connected".format(client.client_id))
+        finally:
+            listener.close()
+            self.event_manager.stop()
+            self.poller.stop()
+
+    def _connect_device(self, device_path):
+        while True:
+            try:
+                proxy = pt.DeviceProxy(device_path)
+                break
+            except pt.DevFailed as e:
+                logger.warning("Could not connect to {0}: {1}".format(device_path, e.args[0].desc))
+            time.sleep(self.retry_interval)
+        logger.info("Connected to {0}".format(device_path))
+        with self.lock:
+            self.devices[device_path] = proxy
+            self.poller.add_device(device_path, proxy)
+            for attr in self.attributes.values():
+                if attr.device_path == device_path:
+                    self._start_reading(attr, proxy)
+
+    def subscribe(self, client, device_path, attr_name, interval, single_shot=False):
+        key = (device_path, attr_name.lower())
+        with self.lock:
+            attr = self.attributes.get(key)
+            if attr is None:
+                attr = HubAttribute(device_path, attr_name, None)
+                self.attributes[key] = attr
+            if client not in attr.clients:
+                attr.clients.append(client)
+            if not single_shot:
+                attr.interval = interval if attr.interval is None else min(attr.interval, interval)
+            if device_path not in self.devices:
+                self.devices[device_path] = None
+                thread = threading.Thread(target=self._connect_device, args=(device_path,),
+                                          name="connect_{0}".format(device_path))
+                thread.daemon = True
+                thread.start()
+            proxy = self.devices[device_path]
+            if proxy is None:
+                # Reading starts when the device is connected
+                return
+            if attr.entry is None and attr.subscription is None:
+                self._start_reading(attr, proxy)
+            elif single_shot:
+                # Single shot requests get a fresh read, the cached value may be old (e.g. the
+                # wavelength axis after a spectrometer reconfiguration)
+                self.poller.add_attribute(device_path, attr.name, lambda data: self._publish_value(attr, data),
+                                          single_shot=True)
+            elif attr.entry is not None and attr.entry.single_shot and attr.subscription is None:
+                # Was only read once so far, now someone wants updates
+                self._poll(attr, attr.interval, False, False)
+            elif attr.entry is not None and not attr.entry.single_shot:
+                attr.entry.interval = attr.interval
+            # Otherwise the event subscription is being set up, and a fallback poll uses attr.interval
+            if attr.info is not None:
+                client.publish("info", key, attr.info)
+            if attr.value is not None and not single_shot:
+                client.publish("value", key, attr.value)
+
+    def _start_reading(self, attr, proxy):
+        # Always fetch the info once so that it can be handed to every client that subscribes
+        if attr.interval is None:
+            self._poll(attr, 1.0, True, True)
+        elif self.use_events:
+            self._poll(attr, attr.interval, True, True)
+            attr.subscription = self.event_manager.subscribe(
+                attr.device_path, proxy, attr.name, lambda data: self._publish_value(attr, data),
+                fallback=lambda: self._poll(attr, attr.interval, False, False),
+                max_period=attr.interval)
+        else:
+            self._poll(attr, attr.interval, False, True)
+
+    def _poll(self, attr, interval, single_shot, get_info):
+        attr.entry = self.poller.add_attribute(attr.device_path, attr.name,
+                                               lambda data: self._publish_value(attr, data),
+                                               interval=interval, single_shot=single_shot, get_info=get_info,
+                                               info_callback=lambda info: self._publish_info(attr, info))
+
+    def _publish_value(self, attr, data):
+        attr.value = snapshot(data)
+        for client in list(attr.clients):
+            client.publish("value", (attr.device_path, attr.name.lower()), attr.value)
+
+    def _publish_info(self, attr, info):
+        attr.info = snapshot(info)
+        for client in list(attr.clients):
+            client.publish("info", (attr.device_path, attr.name.lower()), attr.info)
+
+    def remove_client(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+            for attr in self.attributes.values():
+                if client in attr.clients:
+                    attr.clients.remove(client)
+        logger.info("Client {0} disconnected".format(client.client_id))
+
+
+class HubClient(object):
+    """ GUI side of the hub connection. Subscriptions are remembered and sent again if the
+    connection to the hub is lost and re-established.
+
+    """
+    def __init__(self, address=HUB_ADDRESS, authkey=None, retry_interval=2.0):
+        self.address = address
+        self.authkey = authkey if authkey is not None else load_authkey()
+        self.retry_interval = retry_interval
+        self.conn = None
+        self.subscriptions = dict()
+        self.lock = threading.Lock()
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self._recv_loop, name="hub_client")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def subscribe(self, device_path, attr_name, interval, single_shot, callback, info_callback=None):
+        key = (device_path, attr_name.lower())
+        with self.lock:
+            self.subscriptions.setdefault(key, list()).append((interval, single_shot, callback, info_callback))
+            self._send(("subscribe", device_path, attr_name, interval, single_shot))
+
+    def _send(self, msg):
+        if self.conn is None:
+            return
+        try:
+            self.conn.send(msg)
+        except (OSError, EOFError):
+            pass
+
+    def _connect(self):
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except (OSError, EOFError):
+            return False
+        with self.lock:
+            self.conn = conn
+            for key, subs in self.subscriptions.items():
+                interval = min(s[0] for s in subs)
+                single_shot = all(s[1] for s in subs)
+                self._send(("subscribe", key[0], key[1], interval, single_shot))
+        logger.info("Connected to data hub at {0}".format(self.address))
+        return True
+
+    def _recv_loop(self):
+        while not self.stop_flag:
+            if self.conn is None and not self._connect():
+                time.sleep(self.retry_interval)
+                continue
+            try:
+                msg_type, device_path, attr_name, data = self.conn.recv()
+            except (OSError, EOFError):
+                logger.warning("Lost connection to data hub")
+                with self.lock:
+                    self.conn = None
+                continue
+            with self.lock:
+                subs = self.subscriptions.get((device_path, attr_name), list())
+                if msg_type == "value":
+                    # Single shot subscribers only get the first value
+                    self.subscriptions[(device_path, attr_name)] = [s for s in subs if not s[1]]
+            for interval, single_shot, callback, info_callback in subs:
+                if msg_type == "value":
+                    callback(data)
+                elif info_callback is not None:
+                    info_callback(data)
+
+    def stop(self):
+        self.stop_flag = True
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s : %(levelname)s : %(name)s : %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local data hub for the laser GUIs")
+    parser.add_argument("--port", type=int, default=HUB_ADDRESS[1])
+    parser.add_argument("--no-events", action="store_true", help="Poll all attributes instead of subscribing")
+    args = parser.parse_args()
+    hub = DataHub(address=(HUB_ADDRESS[0], args.port), use_events=not args.no_events)
+    hub.serve_forever()
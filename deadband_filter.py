@@ -0,0 +1,106 @@
+"""
+Deadband filtering of attribute updates before they reach the widgets.
+
+An update is dropped when the displayed text would be identical to the last delivered value
+(using the format from the attribute configuration, or a display format set by the GUI), or
+when the change is smaller than a configured absolute or relative deadband. Changes in quality
+are always delivered.
+
+:created: 2026-10-17
+"""
+
+import logging
+import numbers
+
+logger = logging.getLogger(__name__)
+
+
+class DeadbandFilter(object):
+    """ Per attribute filter of updates that would not change the display.
+
+    :param display_format: printf style format the widget uses, overrides the attribute config format
+    :param abs_deadband: Smallest absolute change that is delivered
+    :param rel_deadband: Smallest change relative to the last delivered value that is delivered
+    """
+    def __init__(self, display_format=None, abs_deadband=None, rel_deadband=None):
+        self.display_format = display_format
+        self.info_format = None
+        self.abs_deadband = abs_deadband
+        self.rel_deadband = rel_deadband
+        self.last_value = None
+        self.last_quality = None
+        self.last_text = None
+        self.accepted_count = 0
+        self.dropped_count = 0
+
+    def configure(self, info):
+        """ Pick up the display format from the attribute configuration (AttributeInfoEx).
+
+        """
+        fmt = getattr(info, "format", None)
+        if self._valid_format(fmt):
+            self.info_format = fmt
+            self.last_text = None
+
+    @staticmethod
+    def _valid_format(fmt):
+        if not isinstance(fmt, str):
+            return False
+        try:
+            fmt % 1.0
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def _format_value(self, value):
+        fmt = self.display_format if self.display_format is not None else self.info_format
+        if fmt is None:
+            return None
+        try:
+            return fmt % value
+        except (TypeError, ValueError):
+            return None
+
+    def accept(self, data):
+        """ Returns True if the update should be delivered to the widget.
+
+        """
+        value = data.value
+        quality = getattr(data, "quality", None)
+        if self._changed(value, quality):
+            self.last_value = value
+            self.last_quality = quality
+            self.accepted_count += 1
+            return True
+        self.dropped_count += 1
+        return False
+
+    def _changed(self, value, quality):
+        if self.last_quality is None or quality != self.last_quality:
+            self.last_text = self._text(value)
+            return True
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            # Arrays are always delivered, states, booleans and strings when they change
+            if hasattr(value, "__len__") and not isinstance(value, str):
+                return True
+            return value != self.last_value
+        if not isinstance(self.last_value, numbers.Real):
+            self.last_text = self._text(value)
+            return True
+        if value == self.last_value:
+            return False
+        text = self._text(value)
+        if text is not None and text == self.last_text:
+            return False
+        delta = abs(value - self.last_value)
+        if self.abs_deadband is not None and delta < self.abs_deadband:
+            return False
+        if self.rel_deadband is not None and delta < self.rel_deadband * abs(self.last_value):
+            return False
+        self.last_text = text
+        return True
+
+    def _text(self, value):
+        if isinstance(value, numbers.Real) and not isinstance(value, bool):
+            return self._format_value(value)
+        return None
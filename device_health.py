@@ -0,0 +1,73 @@
+"""
+Per device health state used by the poller as a circuit breaker.
+
+A device that fails to respond is first marked degraded and after a few more failures open.
+An open device is not read at its normal intervals. Instead one probe read is allowed after an
+exponentially growing backoff time. A successful read closes the breaker again.
+
+:created: 2026-10-17
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+OPEN = "open"
+
+
+class DeviceHealth(object):
+    """ Health state machine for one device: healthy -> degraded -> open.
+
+    :param degraded_after: Number of consecutive failed reads before the device is degraded
+    :param open_after: Number of consecutive failed reads before the breaker opens
+    :param backoff_start: First probe delay (s) when open
+    :param backoff_max: Longest probe delay (s)
+    """
+    def __init__(self, device_name, degraded_after=1, open_after=3, backoff_start=1.0, backoff_max=60.0):
+        self.device_name = device_name
+        self.degraded_after = degraded_after
+        self.open_after = open_after
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.state = HEALTHY
+        self.failures = 0
+        self.backoff = backoff_start
+        self.next_probe = 0.0
+
+    def record_success(self):
+        """ Returns True if the state changed.
+
+        """
+        self.failures = 0
+        self.backoff = self.backoff_start
+        return self._set_state(HEALTHY)
+
+    def record_failure(self, now=None):
+        """ Returns True if the state changed.
+
+        """
+        if now is None:
+            now = time.monotonic()
+        self.failures += 1
+        if self.failures >= self.open_after:
+            if self.state == OPEN:
+                # Failed probe
+                self.backoff = min(2 * self.backoff, self.backoff_max)
+            self.next_probe = now + self.backoff
+            return self._set_state(OPEN)
+        if self.failures >= self.degraded_after:
+            return self._set_state(DEGRADED)
+        return False
+
+    def _set_state(self, state):
+        if state == self.state:
+            return False
+        if state == OPEN:
+            logger.warning("{0} not responding, probing every {1:.0f} s".format(self.device_name, self.backoff))
+        elif state == HEALTHY:
+            logger.info("{0} responding again".format(self.device_name))
+        self.state = state
+        return True
@@ -11,9 +11,13 @@ import logging
 import sys
 import time
 import random
+import argparse
+import datetime
 sys.path.append('../TangoWidgetsQt5')
 import striptool
 from TangoDeviceClient import TangoDeviceClient
+from polling_device_client import PollingDeviceClient
+from data_hub import HUB_ADDRESS
 from ColorDefinitions import QTangoSizes, QTangoColors
 from SliderCompositeWidgets import QTangoAttributeSlider
 from SpectrumCompositeWidgets import QTangoReadAttributeSpectrum
@@ -33,12 +37,16 @@ logger.setLevel(logging.INFO)
 # logger.propagate = False
 
 
-class TestDeviceClient(TangoDeviceClient):
+class TestDeviceClient(PollingDeviceClient):
     """ Example device client using the test laser finesse and redpitaya5.
 
     """
-    def __init__(self):
-        TangoDeviceClient.__init__(self, "Lasers Overview", use_sidebar=False, use_bottombar=False, call_setup_layout=False)
+    def __init__(self, hub_address=None, recorder_path=None, replay_path=None, replay_speed=1.0,
+                 replay_start=None, sim_address=None):
+        PollingDeviceClient.__init__(self, "Lasers Overview", use_sidebar=False, use_bottombar=False, call_setup_layout=False,
+                                     batch_reads=True, use_events=True, hub_address=hub_address,
+                                     recorder_path=recorder_path, replay_path=replay_path, replay_speed=replay_speed,
+                                     replay_start=replay_start, sim_address=sim_address)
 
         self.title_sizes = QTangoSizes()
         self.title_sizes.barHeight = 40
@@ -68,8 +76,8 @@ class TestDeviceClient(TangoDeviceClient):
                            get_info=True, attr_info_slot=self.verdi_power_slider.configureAttribute)
 
         self.verdi_status_label = QTangoDeviceStatus("Verdi", self.attr_sizes, self.colors)
-        self.add_attribute("status", "verdi", self.verdi_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("state", "verdi", self.verdi_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("verdi", self.verdi_status_label.setState, self.verdi_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.verdi_status_label])
 
         # Revolution setup
         #
@@ -81,8 +89,8 @@ class TestDeviceClient(TangoDeviceClient):
                            get_info=True, attr_info_slot=self.revolution_power_slider.configureAttribute)
 
         self.revolution_status_label = QTangoDeviceStatus("Revolution", self.attr_sizes, self.colors)
-        self.add_attribute("status", "revolution", self.revolution_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("state", "revolution", self.revolution_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("revolution", self.revolution_status_label.setState, self.revolution_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.revolution_status_label])
 
         # Vitara setup
         #
@@ -92,13 +100,13 @@ class TestDeviceClient(TangoDeviceClient):
         self.vitara_power_slider.setSliderLimits(0, 700)
         self.add_attribute("pd_power", "vitara", self.read_vitara_power, update_interval=0.3, single_shot=False,
                            get_info=True, attr_info_slot=self.vitara_power_slider.configureAttribute)
-        self.add_attribute("modelock_status", "vitara", self.read_vitara_modelock, update_interval=0.5, single_shot=False,
-                           get_info=False)
         self.vitara_modelock_label = QTangoReadAttributeBoolean("Modelock", self.attr_sizes, self.colors)
+        self.add_attribute("modelock_status", "vitara", self.read_vitara_modelock, update_interval=0.5, single_shot=False,
+                           get_info=False, consumers=[self.vitara_modelock_label])
 
         self.vitara_status_label = QTangoDeviceStatus("Vitara", self.attr_sizes, self.colors)
-        self.add_attribute("status", "vitara", self.vitara_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("state", "vitara", self.vitara_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("vitara", self.vitara_status_label.setState, self.vitara_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.vitara_status_label])
 
         # self.add_attribute("power", "vitara", self.read_vitara_power, update_interval=0.3, single_shot=False,
         #                    get_info=True, attr_info_slot=self.verdi_power_slider.configureAttribute)
@@ -118,8 +126,8 @@ class TestDeviceClient(TangoDeviceClient):
         #
         self.add_device("slap", "astrella/oscillator/synchrolock")
         self.slap_status_label = QTangoDeviceStatus("Synchrolock", self.attr_sizes, self.colors)
-        self.add_attribute("status", "slap", self.slap_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("state", "slap", self.slap_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("slap", self.slap_status_label.setState, self.slap_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.slap_status_label])
         # Separate slap gui? There is quite a lot to adjust.
         self.slap_ferr_label = QTangoReadAttributeDouble("Error freq", self.attr_sizes, self.colors)
         self.add_attribute("error_frequency_abs", "slap", self.read_slap_ferr, update_interval=0.5, single_shot=False,
@@ -138,8 +146,8 @@ class TestDeviceClient(TangoDeviceClient):
         # Astrella shutter setup
         self.add_device("shutter", "gunlaser/thg/shutter")
         self.shutter_status_label = QTangoDeviceStatus("Shutter", self.attr_sizes, self.colors)
-        self.add_attribute("state", "shutter", self.shutter_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "shutter", self.shutter_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("shutter", self.shutter_status_label.setState, self.shutter_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.shutter_status_label])
 
         # THG setup
         #
@@ -155,13 +163,13 @@ class TestDeviceClient(TangoDeviceClient):
                            get_info=True, attr_info_slot=self.finesse_power_slider.configureAttribute)
 
         self.finesse_status_label = QTangoDeviceStatus("Finesse", self.attr_sizes, self.colors)
-        self.add_attribute("state", "finesse", self.finesse_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "finesse", self.finesse_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("finesse", self.finesse_status_label.setState, self.finesse_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.finesse_status_label])
 
         self.add_device("patara", "gunlaser/devices/patara")
         self.patara_status_label = QTangoDeviceStatus("Patara", self.attr_sizes, self.colors)
-        self.add_attribute("state", "patara", self.patara_status, update_interval=0.3, single_shot=False)
-        self.add_attribute("status", "patara", self.patara_status, update_interval=0.3, single_shot=False)
+        self.add_state_status("patara", self.patara_status_label.setState, self.patara_status_label.setStatusText,
+                              update_interval=0.3, consumers=[self.patara_status_label])
 
         self.add_device("redpitaya4", "gunlaser/devices/redpitaya4")
         self.patara_energy_slider = QTangoAttributeSlider("Patara J", self.attr_sizes, self.colors, show_write_widget=False, slider_style=4)
@@ -189,22 +197,22 @@ class TestDeviceClient(TangoDeviceClient):
         self.add_device("halcyon", "gunlaser/oscillator/halcyon_raspberry")
         self.halcyon_modelock_label = QTangoReadAttributeBoolean("Modelock", self.attr_sizes, self.colors)
         self.add_attribute("modelocked", "halcyon", self.read_halcyon_modelock, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.halcyon_modelock_label])
         self.halcyon_ferr_label = QTangoReadAttributeDouble("Error freq", self.attr_sizes, self.colors)
         self.add_attribute("errorfrequency", "halcyon", self.read_halcyon_ferr, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.halcyon_ferr_label])
         self.halcyon_jitter_label = QTangoReadAttributeDouble("Jitter", self.attr_sizes, self.colors)
         self.add_attribute("jitter", "halcyon", self.read_halcyon_jitter, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.halcyon_jitter_label])
 
         self.add_device("cryo_regen", "gunlaser/regen/temperature")
         self.cryo_regen_label = QTangoReadAttributeDouble("Regen Temp", self.attr_sizes, self.colors)
         self.add_attribute("temperature", "cryo_regen", self.read_cryo_regen, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.cryo_regen_label])
         self.add_device("cryo_mp", "gunlaser/mp/temperature")
         self.cryo_mp_label = QTangoReadAttributeDouble("MP Temp", self.attr_sizes, self.colors)
         self.add_attribute("temperature", "cryo_mp", self.read_cryo_mp, update_interval=0.5, single_shot=False,
-                           get_info=False)
+                           get_info=False, consumers=[self.cryo_mp_label])
 
         self.add_device("redpitaya2", "gunlaser/devices/redpitaya2")
         self.kmlabs_ir_energy_slider = QTangoAttributeSlider("IR Energy", self.attr_sizes, self.colors, show_write_widget=False, slider_style=4)
@@ -328,13 +336,6 @@ class TestDeviceClient(TangoDeviceClient):
         logger.debug("In read_verdi_power: {0}".format(data.value))
         self.verdi_power_slider.setAttributeValue(data)
 
-    def verdi_status(self, data):
-        widget = self.verdi_status_label
-        if data.name == "Status":
-            widget.setStatusText(data.value)
-        else:
-            widget.setState(data)
-
     def read_vitara_power(self, data):
         logger.debug("In read_vitara_power: {0}".format(data.value))
         self.vitara_power_slider.setAttributeValue(data)
@@ -343,13 +344,6 @@ class TestDeviceClient(TangoDeviceClient):
         logger.debug("In read_vitara_modelock: {0}".format(data.value))
         self.vitara_modelock_label.setAttributeValue(data)
 
-    def vitara_status(self, data):
-        widget = self.vitara_status_label
-        if data.name == "Status":
-            widget.setStatusText(data.value)
-        else:
-            widget.setState(data)
-
     def read_astrella_l0(self, data):
         self.vitara_l0_slider.setAttributeValue(data)
 
@@ -360,49 +354,17 @@ class TestDeviceClient(TangoDeviceClient):
         logger.debug("In read_revolution_power: {0}".format(data.value))
         self.revolution_power_slider.setAttributeValue(data)
 
-    def revolution_status(self, data):
-        if data.name == "Status":
-            self.revolution_status_label.setStatusText(data.value)
-        else:
-            self.revolution_status_label.setState(data)
-
-    def slap_status(self, data):
-        if data.name == "Status":
-            self.slap_status_label.setStatusText(data.value)
-        else:
-            self.slap_status_label.setState(data)
-
     def read_slap_ferr(self, data):
         self.slap_ferr_label.setAttributeValue(data)
 
-    def shutter_status(self, data):
-        if data.name == "Status":
-            self.shutter_status_label.setStatusText(data.value)
-        else:
-            self.shutter_status_label.setState(data)
-
     def read_finesse_power(self, data):
         logger.debug("In read_finesse_power: {0}".format(data.value))
         self.finesse_power_slider.setAttributeValue(data)
 
-    def finesse_status(self, data):
-        widget = self.finesse_status_label
-        if data.name == "Status":
-            widget.setStatusText(data.value)
-        else:
-            widget.setState(data)
-
     def read_patara_energy(self, data):
         logger.debug("In read_patara_energy: {0}".format(data.value))
         self.patara_energy_slider.setAttributeValue(data)
 
-    def patara_status(self, data):
-        widget = self.patara_status_label
-        if data.name == "Status":
-            widget.setStatusText(data.value)
-        else:
-            widget.setState(data)
-
     def read_gunlaser_osc_power(self, data):
         self.gunlaser_osc_power_slider.setAttributeValue(data)
 
@@ -441,7 +403,17 @@ class TestDeviceClient(TangoDeviceClient):
 
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hub", action="store_true", help="Read attributes from the local data hub")
+    parser.add_argument("--record", metavar="DIR", help="Record all attribute updates to DIR")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recording (directory or day directory) "
+                                                         "instead of connecting to the devices")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible")
+    parser.add_argument("--start", help="Replay start time, e.g. \"2026-10-17 14:30\"")
+    parser.add_argument("--sim", metavar="HOST:PORT", nargs="?", const="localhost:45450",
+                        help="Connect to the simulated devices of simulated_devices.py")
+    args, qt_args = parser.parse_known_args()
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
 
     pic_list = ["estrella2_rs.png", "estrella_beer_2.png", "estrella_damm.png"]
     random.seed(time.time_ns())
@@ -460,7 +432,10 @@ if __name__ == "__main__":
     splash.showMessage('Starting GUI\n\n\n', alignment=int(QtCore.Qt.AlignBottom) | int(QtCore.Qt.AlignHCenter),
                        color=QtGui.QColor('#000000'))
     app.processEvents()
-    myapp = TestDeviceClient()
+    replay_start = datetime.datetime.fromisoformat(args.start).timestamp() if args.start else None
+    myapp = TestDeviceClient(hub_address=HUB_ADDRESS if args.hub else None, recorder_path=args.record,
+                             replay_path=args.replay, replay_speed=args.speed,
+                             replay_start=replay_start, sim_address=args.sim)
     myapp.show()
     splash.finish(myapp)
     app.setWindowIcon(QtGui.QIcon("estrella_beer_2.png"))
@@ -0,0 +1,171 @@
+"""
+End-to-end latency benchmark: device value change to widget repaint.
+
+Starts the simulated devices (simulated_devices.py) in a separate process with values that
+change every step interval, timestamped at the source with the time of the change. Then
+astrella_control5 and entrance_screen are run against them, one after the other, each for
+duration s with the offscreen Qt platform.
+
+The read slot of every polled attribute is wrapped, so that each new value that reaches the
+GUI (after the deadband filter and frame coalescing) is remembered with its source timestamp.
+An application event filter catches the next paint event of a consumer widget of the
+attribute (or of a child widget), and the latency is the time of that paint event minus the
+source timestamp. It includes the wait for the next poll, the read, the delivery to the GUI
+thread and the wait for the next frame. Values replaced by a newer value before a repaint are
+counted as unpainted.
+
+    python latency_benchmark.py --duration 60 --step-interval 1.0 --output latency.json
+
+p50/p95/p99 are printed per attribute and overall for each GUI, and written to the output file
+as json to be compared between versions.
+
+:created: 2026-10-17
+"""
+
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtWidgets
+import argparse
+import logging
+import json
+import time
+import sys
+import numpy as np
+from polling_device_client import PolledAttribute
+from simulated_devices import start_context, SIM_PORT
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyProbe(QtCore.QObject):
+    """ Measures source timestamp to repaint latency of the polled attributes of client.
+
+    """
+    def __init__(self, client):
+        QtCore.QObject.__init__(self)
+        self.client = client
+        # Attribute key: (source time, consumer widgets) of the value waiting for a repaint
+        self.pending = dict()
+        self.last_source = dict()
+        self.latencies = dict()
+        self.unpainted = dict()
+        for attr in client.attributes.values():
+            if isinstance(attr, PolledAttribute):
+                self._wrap(attr)
+        QtWidgets.QApplication.instance().installEventFilter(self)
+
+    def _wrap(self, attr):
+        key = "{0}/{1}".format(attr.device_name, attr.name)
+        widgets = list(attr.consumers)
+        slot_widget = getattr(attr.callback_slot, "__self__", None)
+        if len(widgets) == 0:
+            widgets = [slot_widget if isinstance(slot_widget, QtWidgets.QWidget) else self.client]
+        slot = attr.callback_slot
+
+        def probed_slot(data):
+            slot(data)
+            try:
+                t_source = data.time.totime()
+            except AttributeError:
+                return
+            if t_source <= self.last_source.get(key, 0.0):
+                return
+            self.last_source[key] = t_source
+            if key in self.pending:
+                self.unpainted[key] = self.unpainted.get(key, 0) + 1
+            self.pending[key] = (t_source, widgets)
+
+        attr.callback_slot = probed_slot
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint and len(self.pending) > 0 and isinstance(obj, QtWidgets.QWidget):
+            now = time.time()
+            for key, (t_source, widgets) in list(self.pending.items()):
+                if any(w is obj or w.isAncestorOf(obj) for w in widgets):
+                    self.latencies.setdefault(key, list()).append(now - t_source)
+                    del self.pending[key]
+        return False
+
+    def stop(self):
+        QtWidgets.QApplication.instance().removeEventFilter(self)
+
+    def report(self):
+        """ Returns a dict of attribute key (and "overall"): count, unpainted and percentiles (ms).
+
+        """
+        result = dict()
+        for key in sorted(self.latencies):
+            result[key] = self._stats(self.latencies[key], self.unpainted.get(key, 0))
+        all_latencies = [t for values in self.latencies.values() for t in values]
+        result["overall"] = self._stats(all_latencies, sum(self.unpainted.values()))
+        return result
+
+    @staticmethod
+    def _stats(latencies, unpainted):
+        stats = {"count": len(latencies), "unpainted": unpainted}
+        if len(latencies) > 0:
+            values = np.percentile(1e3 * np.array(latencies), PERCENTILES)
+            stats.update({"p{0}".format(p): float(v) for p, v in zip(PERCENTILES, values)})
+        return stats
+
+
+def run_gui(app, client_class, sim_address, duration):
+    """ Run a GUI against the simulated devices for duration s and return the probe report.
+
+    """
+    client = client_class(sim_address=sim_address)
+    probe = LatencyProbe(client)
+    client.show()
+    QtCore.QTimer.singleShot(int(1000 * duration), app.quit)
+    app.exec_()
+    probe.stop()
+    client.close()
+    app.processEvents()
+    return probe.report()
+
+
+def print_report(name, report):
+    print("\n{0}".format(name))
+    print("{0:<48} {1:>6} {2:>9} {3:>9} {4:>9} {5:>9}".format("attribute", "count", "unpainted",
+                                                               "p50 (ms)", "p95 (ms)", "p99 (ms)"))
+    for key, stats in report.items():
+        print("{0:<48} {1:>6} {2:>9} {3:>9} {4:>9} {5:>9}".format(
+            key, stats["count"], stats["unpainted"],
+            *["{0:.1f}".format(stats["p{0}".format(p)]) if "p{0}".format(p) in stats else "-" for p in PERCENTILES]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Device value change to repaint latency of the GUIs")
+    parser.add_argument("--gui", choices=["astrella", "entrance", "both"], default="both")
+    parser.add_argument("--duration", type=float, default=60.0, help="Run time of each GUI (s)")
+    parser.add_argument("--step-interval", type=float, default=1.0, help="Time between value changes (s)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated device latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Simulated device jitter (s)")
+    parser.add_argument("--port", type=int, default=SIM_PORT)
+    parser.add_argument("--output", metavar="FILE", help="Write the results as json to FILE")
+    args, qt_args = parser.parse_known_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    guis = list()
+    if args.gui in ("astrella", "both"):
+        import astrella_control5
+        guis.append(("astrella_control5", astrella_control5.TestDeviceClient))
+    if args.gui in ("entrance", "both"):
+        import entrance_screen
+        guis.append(("entrance_screen", entrance_screen.TestDeviceClient))
+
+    results = dict()
+    with start_context(port=args.port, latency=args.latency, jitter=args.jitter,
+                       step_interval=args.step_interval, process=True):
+        sim_address = "localhost:{0}".format(args.port)
+        for name, client_class in guis:
+            results[name] = run_gui(app, client_class, sim_address, args.duration)
+            print_report(name, results[name])
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"time": time.time(), "duration": args.duration, "step_interval": args.step_interval,
+                       "latency": args.latency, "jitter": args.jitter, "results": results}, f, indent=1)
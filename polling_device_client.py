@@ -0,0 +1,496 @@
+"""
+Device client that reads attributes through the batched attribute poller instead of one
+reader per add_attribute call.
+
+:created: 2026-10-17
+"""
+
+from PyQt5 import QtCore, QtWidgets
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import time
+import sys
+import tango as pt
+sys.path.append('../TangoWidgetsQt5')
+from TangoDeviceClient import TangoDeviceClient
+from attribute_poller import AttributePoller
+from attribute_events import AttributeEventManager
+from visibility_gate import VisibilityGate
+from data_hub import HubClient
+from render_coalescer import RenderCoalescer
+from deadband_filter import DeadbandFilter
+from device_health import OPEN
+from attribute_config_cache import AttributeConfigCache
+from attribute_history import AttributeHistory
+from attribute_recorder import AttributeRecorder
+from attribute_replay import AttributeReplay
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredDeviceProxy(object):
+    """ Stand-in for a DeviceProxy that is being created in the background. Once connected, any
+    use of it (commands, attribute writes) goes to the proxy. Until then calls are logged and
+    ignored, so that the GUI thread is never blocked by a device that does not respond.
+
+    """
+    def __init__(self, device_path, future):
+        self._device_path = device_path
+        self._future = future
+
+    def is_connected(self):
+        return self._future.done() and self._future.exception() is None
+
+    def __getattr__(self, name):
+        if self.is_connected():
+            return getattr(self._future.result(), name)
+
+        def ignored(*args, **kwargs):
+            logger.warning("{0} not connected, {1} ignored".format(self._device_path, name))
+        return ignored
+
+
+class ReplayDeviceProxy(object):
+    """ Stand-in for a DeviceProxy in replay mode. Commands and attribute writes are ignored.
+
+    """
+    def __init__(self, device_path):
+        self._device_path = device_path
+
+    def is_connected(self):
+        return False
+
+    def __getattr__(self, name):
+        def ignored(*args, **kwargs):
+            logger.info("Replay mode, {0} {1} ignored".format(self._device_path, name))
+        return ignored
+
+
+class PolledAttribute(QtCore.QObject):
+    """ Attribute read by the batched poller. Has the same signals as the per attribute reader.
+
+    Values emitted on attrSignal (from the reading threads) are delivered to the read slot in
+    the GUI thread, through the deadband filter and the render coalescer if there are any.
+
+    """
+    attrSignal = QtCore.pyqtSignal(object)
+    attrInfoSignal = QtCore.pyqtSignal(object)
+
+    def __init__(self, name, device_name, device, callback_slot, coalescer=None, key=None):
+        QtCore.QObject.__init__(self)
+        self.name = name
+        self.device_name = device_name
+        # History, recording and replay key
+        self.key = key if key is not None else "{0}/{1}".format(device_name, name)
+        self.device = device
+        self.callback_slot = callback_slot
+        self.coalescer = coalescer
+        self.filter = None
+        self.history = None
+        self.recorder = None
+        self.consumers = list()
+        self.entry = None
+        self.subscription = None
+        self.visible = True
+        self.stopped = False
+        self.attrSignal.connect(self.deliver)
+        self.attrInfoSignal.connect(self.configure_filter)
+
+    @QtCore.pyqtSlot(object)
+    def configure_filter(self, info):
+        if self.filter is not None:
+            self.filter.configure(info)
+
+    @QtCore.pyqtSlot(object)
+    def deliver(self, data):
+        if self.history is not None:
+            self.history.record(self.key, data)
+        if self.recorder is not None:
+            self.recorder.record(self.key, data)
+        if self.filter is not None and not self.filter.accept(data):
+            return
+        if self.coalescer is not None:
+            self.coalescer.submit(self, self.callback_slot, data)
+        else:
+            self.callback_slot(data)
+
+    def attr_write(self, wvalue):
+        self.device.write_attribute(self.name, wvalue)
+
+    def stop_read(self):
+        self.stopped = True
+        if self.entry is not None:
+            self.entry.active = False
+        if self.subscription is not None:
+            self.subscription.unsubscribe()
+
+
+class PollingDeviceClient(TangoDeviceClient):
+    """ TangoDeviceClient where all non single shot attributes of a device are read together.
+
+    With batch_reads=True every attribute due on a device at a given tick is collected into a
+    single read_attributes call and the result is fanned out to the registered callbacks.
+    With batch_reads=False the normal per attribute readers are used.
+
+    With use_events=True attributes are subscribed to change or periodic events instead of
+    being polled. Attributes whose device server does not push events (or only pushes periodic
+    events slower than the requested update interval) fall back to the batched poller.
+
+    Polled attributes are only read while one of their consumer widgets is shown, and no
+    attributes are polled while the window is minimised or hidden. The consumers are the
+    widget of attr_info_slot and any widgets given in the consumers argument of add_attribute.
+    Attributes without consumers are read whenever the window is shown.
+
+    With hub_address set all attribute values and configurations are read from the local data
+    hub (see data_hub.py) instead of from the devices. Commands and writes still go directly
+    to the devices.
+
+    With frame_rate set, read slots are called at most once per frame per attribute with the
+    latest value (see render_coalescer.py). Set frame_rate=None to call them on every update.
+
+    With deadband_filter=True updates that would not change the displayed value are dropped
+    (see deadband_filter.py). The display format is taken from the attribute configuration
+    or from the display_format argument of add_attribute, and abs_deadband/rel_deadband add
+    a minimum change.
+
+    Device proxies are created concurrently in background threads, so that the window can be
+    shown directly and the widgets fill in as each device connects. Until then self.devices
+    holds a DeferredDeviceProxy.
+
+    When a device stops responding the consumer widgets of its attributes are disabled to show
+    that the values are stale, and enabled again when the device responds.
+
+    The read round trip time of each device is logged every statistics_interval s (None to
+    disable).
+
+    With config_cache=True attribute configurations (get_info=True) are stored on disk (see
+    attribute_config_cache.py). At the next start the attr_info_slot is called directly with
+    the cached configuration, and the configuration is read from the device config_check_delay s
+    later. The slot is only called again if the configuration has changed.
+
+    With history_capacity set, the last history_capacity values of every scalar attribute are
+    kept in self.history (see attribute_history.py) for strip charts. Values are recorded as
+    they are read, before the deadband filter, so attributes that are not polled while their
+    widgets are hidden have gaps.
+
+    With recorder_path set, every update is also recorded to disk in that directory (see
+    attribute_recorder.py).
+
+    With replay_path set, no devices are connected. The attribute values are instead replayed
+    from a recording at replay_speed times real time (None or 0 for as fast as possible),
+    starting at replay_start (s since epoch) and delivered through the same read slots.
+    Attribute configurations come from the config cache. Commands and writes are ignored.
+
+    With sim_address set ("host:port"), the devices are connected on the simulated device server
+    at that address (see simulated_devices.py) instead of through the Tango database.
+
+    """
+    deviceHealthSignal = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, *args, batch_reads=True, use_events=False, hub_address=None, frame_rate=30.0,
+                 deadband_filter=True, config_cache=True, config_check_delay=5.0, history_capacity=20000,
+                 recorder_path=None, replay_path=None, replay_speed=1.0, replay_start=None, sim_address=None,
+                 statistics_interval=60.0, **kwargs):
+        TangoDeviceClient.__init__(self, *args, **kwargs)
+        self.sim_address = sim_address
+        if config_cache:
+            self.config_cache = AttributeConfigCache()
+        else:
+            self.config_cache = None
+        self.config_check_delay = config_check_delay
+        if history_capacity is not None:
+            self.history = AttributeHistory(history_capacity)
+        else:
+            self.history = None
+        self.recorder = None
+        if recorder_path is not None:
+            try:
+                self.recorder = AttributeRecorder(recorder_path)
+            except RuntimeError as e:
+                logger.error("Not recording: {0}".format(e))
+        self.deadband_filter = deadband_filter
+        if frame_rate is not None:
+            self.render_coalescer = RenderCoalescer(frame_rate, self)
+        else:
+            self.render_coalescer = None
+        self.batch_reads = batch_reads
+        self.use_events = use_events
+        self.device_paths = dict()
+        # Tango device path without the --sim prefix, for keys that are the same in all GUIs
+        self.source_paths = dict()
+        self.connected_devices = dict()
+        self.pending_subscriptions = dict()
+        self.connect_lock = threading.Lock()
+        self.connect_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="connect")
+        # Set when the window is closed, stops the connection retries
+        self.closing = threading.Event()
+        if hub_address is not None:
+            self.hub_client = HubClient(hub_address)
+        else:
+            self.hub_client = None
+        self.poller = AttributePoller(health_callback=self.deviceHealthSignal.emit)
+        self.deviceHealthSignal.connect(self.set_device_health)
+        self.event_manager = AttributeEventManager()
+        self.visibility_gate = VisibilityGate(self, self._set_attribute_visible, self.poller.set_paused)
+        self.replay_attributes = dict()
+        self.replay_values = dict()
+        self.replay_lock = threading.Lock()
+        if replay_path is not None:
+            self.replay = AttributeReplay(replay_path, self._replay_update, replay_speed, replay_start)
+            # Start when the attributes have been added and the event loop runs
+            QtCore.QTimer.singleShot(0, self.replay.start)
+        else:
+            self.replay = None
+        if statistics_interval is not None and self.replay is None:
+            self.statistics_timer = QtCore.QTimer(self)
+            self.statistics_timer.timeout.connect(self.log_device_statistics)
+            self.statistics_timer.start(int(1000 * statistics_interval))
+        else:
+            self.statistics_timer = None
+
+    def add_device(self, name, device_name):
+        self.source_paths[name] = device_name.lower()
+        if self.sim_address is not None:
+            device_name = "tango://{0}/{1}#dbase=no".format(self.sim_address, device_name)
+        self.device_paths[name] = device_name
+        if self.replay is not None:
+            self.devices[name] = ReplayDeviceProxy(device_name)
+            return
+        self.poller.add_device(name, None)
+        future = self.connect_executor.submit(self._connect_device, name, device_name)
+        self.devices[name] = DeferredDeviceProxy(device_name, future)
+
+    def _connect_device(self, name, device_path, retry_interval=10.0):
+        t0 = time.time()
+        while True:
+            try:
+                proxy = pt.DeviceProxy(device_path)
+                break
+            except pt.DevFailed as e:
+                logger.warning("Could not connect to {0}: {1}".format(device_path, e.args[0].desc))
+            if self.closing.wait(retry_interval):
+                raise RuntimeError("Closed before {0} connected".format(device_path))
+        logger.debug("Connected to {0} in {1:.0f} ms".format(device_path, 1e3 * (time.time() - t0)))
+        self.poller.set_device_proxy(name, proxy)
+        with self.connect_lock:
+            self.connected_devices[name] = proxy
+            pending = self.pending_subscriptions.pop(name, list())
+        for subscribe in pending:
+            subscribe(proxy)
+        return proxy
+
+    def _when_connected(self, device_name, func):
+        """ Call func(proxy) directly if the device is connected, otherwise when it connects.
+
+        """
+        with self.connect_lock:
+            proxy = self.connected_devices.get(device_name)
+            if proxy is None:
+                self.pending_subscriptions.setdefault(device_name, list()).append(func)
+                return
+        func(proxy)
+
+    def add_attribute(self, attribute_name, device_name, callback_slot, update_interval=0.5, single_shot=False,
+                      get_info=False, attr_info_slot=None, use_events=None, consumers=None,
+                      display_format=None, abs_deadband=None, rel_deadband=None):
+        if use_events is None:
+            use_events = self.use_events
+        if not self.batch_reads and not use_events and self.hub_client is None and self.replay is None:
+            TangoDeviceClient.add_attribute(self, attribute_name, device_name, callback_slot,
+                                            update_interval=update_interval, single_shot=single_shot,
+                                            get_info=get_info, attr_info_slot=attr_info_slot)
+            return
+        attr_key = "{0}_{1}".format(attribute_name, device_name)
+        attr = PolledAttribute(attribute_name, device_name, self.devices[device_name], callback_slot,
+                               self.render_coalescer,
+                               key="{0}/{1}".format(self.source_paths[device_name], attribute_name.lower()))
+        if self.deadband_filter:
+            attr.filter = DeadbandFilter(display_format, abs_deadband, rel_deadband)
+        attr.history = self.history
+        attr.recorder = self.recorder
+        if attr_info_slot is not None:
+            attr.attrInfoSignal.connect(attr_info_slot)
+        consumers = list(consumers) if consumers is not None else list()
+        info_widget = getattr(attr_info_slot, "__self__", None)
+        if isinstance(info_widget, QtWidgets.QWidget) and info_widget not in consumers:
+            consumers.append(info_widget)
+        attr.consumers = consumers
+        if len(consumers) > 0:
+            self.visibility_gate.add_consumers(attr_key, consumers)
+        if self.replay is not None:
+            self._replay_attribute(attr, single_shot, get_info)
+        elif self.hub_client is not None:
+            info_callback = attr.attrInfoSignal.emit if get_info else None
+            self.hub_client.subscribe(self.device_paths[device_name], attribute_name, update_interval, single_shot,
+                                      attr.attrSignal.emit, info_callback)
+        elif use_events and not single_shot:
+            # Initial value and attribute info are read once, after that the events take over
+            self._poll_attribute(attr, update_interval, True, get_info)
+            self._when_connected(device_name, lambda proxy: self._subscribe_attribute(attr, proxy, update_interval))
+        else:
+            self._poll_attribute(attr, update_interval, single_shot, get_info)
+        self.attributes[attr_key] = attr
+
+    def add_state_status(self, device_name, state_slot, status_slot, update_interval=0.3, status_interval=None,
+                         consumers=None):
+        """ Read state and status of a device for a command or status panel.
+
+        State goes through the normal use_events path, so with events it is shown as soon as it
+        changes. Status is polled every status_interval s, since most device servers push no
+        status events, and read once more directly when the state changes. If state events are
+        not available, state is polled every update_interval s and read together with status in
+        the same read_attributes call whenever both are due.
+
+        state_slot is called with the state reading and status_slot with the status text. The
+        status text is only passed on when it has changed.
+
+        :param device_name: Name of the device given in add_device
+        :param state_slot: Called with the DeviceAttribute of state, e.g. a widget setState method
+        :param status_slot: Called with the status string, e.g. a widget setStatusText method
+        :param update_interval: Read interval (s) of state when it is polled
+        :param status_interval: Read interval (s) of status, default update_interval
+        :param consumers: Widgets showing the state, see add_attribute
+        """
+        if status_interval is None:
+            status_interval = update_interval
+        last_state = [None]
+        last_status = [None]
+
+        def state_changed(data):
+            state_slot(data)
+            if data.value != last_state[0]:
+                if last_state[0] is not None and self.replay is None and self.hub_client is None:
+                    status_attr = self.attributes["status_{0}".format(device_name)]
+                    self.poller.add_attribute(device_name, "status", status_attr.attrSignal.emit, single_shot=True)
+                last_state[0] = data.value
+
+        def status_changed(data):
+            if data.value != last_status[0]:
+                last_status[0] = data.value
+                status_slot(data.value)
+
+        self.add_attribute("state", device_name, state_changed, update_interval=update_interval,
+                           consumers=consumers)
+        self.add_attribute("status", device_name, status_changed, update_interval=status_interval,
+                           use_events=False, consumers=consumers)
+
+    def add_config_listener(self, attribute_name, device_name, callback_slot):
+        """ Call callback_slot in the GUI thread with the new configuration (AttributeInfoEx) when
+        the configuration of the attribute changes. Uses attribute config events, so nothing is
+        called if the device server does not push them (or in hub and replay mode).
+
+        """
+        if self.hub_client is not None or self.replay is not None:
+            return
+        attr = PolledAttribute(attribute_name, device_name, self.devices[device_name], callback_slot)
+
+        def subscribe(proxy):
+            if not attr.stopped:
+                attr.subscription = self.event_manager.subscribe(
+                    device_name, proxy, attribute_name, attr.attrSignal.emit,
+                    event_types=[pt.EventType.ATTR_CONF_EVENT])
+
+        self._when_connected(device_name, subscribe)
+        self.attributes["{0}_{1}_config".format(attribute_name, device_name)] = attr
+
+    def _replay_attribute(self, attr, single_shot, get_info):
+        key = attr.key
+        if get_info and self.config_cache is not None:
+            cached = self.config_cache.get(self.device_paths[attr.device_name], attr.name)
+            if cached is not None:
+                attr.attrInfoSignal.emit(cached)
+        with self.replay_lock:
+            last_data = self.replay_values.get(key)
+            if not single_shot or last_data is None:
+                self.replay_attributes.setdefault(key, list()).append((attr, single_shot))
+        if last_data is not None:
+            attr.attrSignal.emit(last_data)
+
+    def _replay_update(self, key, data):
+        """ Called from the replay thread for every replayed record.
+
+        """
+        with self.replay_lock:
+            self.replay_values[key] = data
+            attrs = self.replay_attributes.get(key, list())
+            self.replay_attributes[key] = [a for a in attrs if not a[1]]
+        for attr, single_shot in attrs:
+            if not attr.stopped:
+                attr.attrSignal.emit(data)
+
+    def _subscribe_attribute(self, attr, proxy, update_interval):
+        if attr.stopped:
+            return
+        attr.subscription = self.event_manager.subscribe(
+            attr.device_name, proxy, attr.name, attr.attrSignal.emit,
+            fallback=lambda: self._poll_attribute(attr, update_interval, False, False),
+            max_period=update_interval)
+
+    def _poll_attribute(self, attr, update_interval, single_shot, get_info):
+        info_callback = attr.attrInfoSignal.emit
+        if get_info and self.config_cache is not None:
+            device_path = self.device_paths[attr.device_name]
+            info_callback = lambda info: self._update_config(attr, device_path, info)
+            cached = self.config_cache.get(device_path, attr.name)
+            if cached is not None:
+                # Configure the widgets from the cache now and check against the device later
+                attr.attrInfoSignal.emit(cached)
+                get_info = False
+                self.poller.add_attribute(attr.device_name, attr.name, None, single_shot=True, get_info=True,
+                                          info_callback=info_callback, delay=self.config_check_delay)
+        attr.entry = self.poller.add_attribute(attr.device_name, attr.name, attr.attrSignal.emit,
+                                               interval=update_interval, single_shot=single_shot,
+                                               get_info=get_info, info_callback=info_callback)
+        if not attr.visible:
+            self.poller.set_attribute_visible(attr.device_name, attr.entry, False)
+
+    def _update_config(self, attr, device_path, info):
+        if self.config_cache.update(device_path, attr.name, info):
+            logger.debug("New config for {0}/{1}".format(device_path, attr.name))
+            attr.attrInfoSignal.emit(info)
+
+    def _set_attribute_visible(self, attr_key, visible):
+        attr = self.attributes.get(attr_key)
+        if not isinstance(attr, PolledAttribute):
+            return
+        attr.visible = visible
+        if attr.entry is not None:
+            self.poller.set_attribute_visible(attr.device_name, attr.entry, visible)
+
+    def set_device_health(self, device_name, state):
+        stale = state == OPEN
+        for attr in self.attributes.values():
+            if isinstance(attr, PolledAttribute) and attr.device_name == device_name:
+                for w in attr.consumers:
+                    w.setEnabled(not stale)
+
+    def get_poll_statistics(self):
+        """ Due, late and skipped counters of all polled attributes.
+
+        """
+        return self.poller.get_statistics()
+
+    def log_device_statistics(self):
+        """ Log the read round trip time of each device, slowest first.
+
+        """
+        stats = self.poller.get_device_statistics()
+        for name, st in sorted(stats.items(), key=lambda x: -(x[1]["rtt"] or 0.0)):
+            if st["rtt"] is None:
+                continue
+            logger.info("{0}: rtt {1:.1f} ms (max {2:.1f} ms), {3} reads{4}".format(
+                name, 1e3 * st["rtt"], 1e3 * st["rtt_max"], st["reads"], ", interval stretched" if st["stretched"] else ""))
+
+    def closeEvent(self, event):
+        self.closing.set()
+        if self.replay is not None:
+            self.replay.stop()
+        self.connect_executor.shutdown(wait=False)
+        if self.hub_client is not None:
+            self.hub_client.stop()
+        self.event_manager.stop()
+        self.poller.stop()
+        if self.recorder is not None:
+            self.recorder.stop()
+        TangoDeviceClient.closeEvent(self, event)
@@ -0,0 +1,277 @@
+"""
+Indexed queries on recordings made with attribute_recorder.py.
+
+Each day directory gets an index next to its records, built the first time the day is queried.
+Records appended after that (while the day is being recorded) are scanned until there are
+REINDEX_RECORDS of them, then the index is rebuilt:
+
+    index_order.npy   Record positions sorted on attribute, then time
+    index_time.npy    Timestamps in the same order
+    index_start.npy   Start of each attribute (catalog index) in the arrays above
+    index_info.json   Number of indexed records and the time span of the day
+
+The index files are memory mapped, so a query only reads the index and records of the
+requested attribute and time range, and days outside the range are skipped on their time span.
+
+Example:
+
+    index = RecordingIndex("recordings")
+    t, uv = index.query("gunlaser/thg/energy/uv_energy", start, end)
+    shutter_open = index.value_at("gunlaser/thg/shutter/state", t) == int(pt.DevState.OPEN)
+    modelock_lost = index.intervals("astrella/oscillator/vitara/modelock_status", lambda v: v == 0, start, end)
+
+:created: 2026-10-17
+"""
+
+import logging
+import json
+import os
+import numpy as np
+from attribute_recorder import RecordingDay, day_directories, RECORD_DTYPE, RECORDS_FILENAME, KIND_STRING, \
+    KIND_SPECTRUM
+
+logger = logging.getLogger(__name__)
+
+INDEX_INFO_FILENAME = "index_info.json"
+# Records appended after the index was built are scanned until there are this many
+REINDEX_RECORDS = 100000
+
+
+class DayIndex(object):
+    """ Recording and index of one day.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.day = None
+        self.indexed = 0
+        self.order = None
+        self.times = None
+        self.starts = None
+        self.tail_attrs = None
+        self.tail_times = None
+        self.t_min = None
+        self.t_max = None
+        self.open()
+
+    def open(self):
+        """ Open the records of the day and the index, rebuilding the index if it is missing or
+        too many records have been appended since it was built. Called again to see records
+        appended since the last call.
+
+        """
+        # Drop the old maps first, the index files can't be replaced while mapped on Windows
+        self.close()
+        self.day = RecordingDay(self.path)
+        count = self.day.records.shape[0]
+        info_name = os.path.join(self.path, INDEX_INFO_FILENAME)
+        info = None
+        if os.path.exists(info_name):
+            with open(info_name, "r") as f:
+                info = json.load(f)
+        if info is None or info["record_count"] > count or count - info["record_count"] > REINDEX_RECORDS:
+            info = self.build()
+        self.indexed = info["record_count"]
+        self.order = np.load(os.path.join(self.path, "index_order.npy"), mmap_mode="r")
+        self.times = np.load(os.path.join(self.path, "index_time.npy"), mmap_mode="r")
+        self.starts = np.load(os.path.join(self.path, "index_start.npy"))
+        tail = self.day.records[self.indexed:]
+        self.tail_attrs = np.asarray(tail["attr"])
+        self.tail_times = np.asarray(tail["time"])
+        t_min = [t for t in (info["t_min"], self.tail_times.min() if tail.shape[0] > 0 else None) if t is not None]
+        t_max = [t for t in (info["t_max"], self.tail_times.max() if tail.shape[0] > 0 else None) if t is not None]
+        self.t_min = float(min(t_min)) if len(t_min) > 0 else None
+        self.t_max = float(max(t_max)) if len(t_max) > 0 else None
+
+    def close(self):
+        self.order = None
+        self.times = None
+        self.starts = None
+        self.day = None
+
+    def build(self):
+        records = self.day.records
+        logger.info("Indexing {0}, {1} records".format(self.path, records.shape[0]))
+        attrs = np.asarray(records["attr"])
+        times = np.asarray(records["time"])
+        order = np.lexsort((times, attrs)).astype(np.int64)
+        starts = np.searchsorted(attrs[order], np.arange(len(self.day.attributes) + 1))
+        info = {"record_count": int(records.shape[0]),
+                "t_min": float(times.min()) if times.shape[0] > 0 else None,
+                "t_max": float(times.max()) if times.shape[0] > 0 else None}
+        for name, array in (("index_order.npy", order), ("index_time.npy", times[order]),
+                            ("index_start.npy", starts)):
+            self._save(name, array)
+        tmp_name = os.path.join(self.path, INDEX_INFO_FILENAME + ".tmp")
+        with open(tmp_name, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp_name, os.path.join(self.path, INDEX_INFO_FILENAME))
+        return info
+
+    def _save(self, name, array):
+        tmp_name = os.path.join(self.path, name + ".tmp")
+        with open(tmp_name, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_name, os.path.join(self.path, name))
+
+    def overlaps(self, start, end):
+        if self.t_min is None:
+            return False
+        return (start is None or self.t_max >= start) and (end is None or self.t_min <= end)
+
+    def positions(self, name, start=None, end=None):
+        """ Record positions of attribute name between start and end, in time order.
+
+        """
+        try:
+            a = self.day.attributes.index(name)
+        except ValueError:
+            return np.zeros(0, dtype=np.int64)
+        if a + 1 < self.starts.shape[0]:
+            i0 = int(self.starts[a])
+            i1 = int(self.starts[a + 1])
+            times = self.times[i0:i1]
+            if start is not None:
+                i0 += int(np.searchsorted(times, start, side="left"))
+            if end is not None:
+                i1 = int(self.starts[a]) + int(np.searchsorted(times, end, side="right"))
+            indexed = self.order[i0:i1]
+        else:
+            # Attribute added to the catalog after the index was built
+            indexed = np.zeros(0, dtype=np.int64)
+        # Records appended after the index was built
+        mask = self.tail_attrs == a
+        if start is not None:
+            mask &= self.tail_times >= start
+        if end is not None:
+            mask &= self.tail_times <= end
+        if not mask.any():
+            return indexed
+        tail = np.flatnonzero(mask)
+        tail = self.indexed + tail[np.argsort(self.tail_times[tail], kind="stable")]
+        return np.concatenate((indexed, tail))
+
+
+class RecordingIndex(object):
+    """ Query API for a recording directory (or one day directory).
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.days = dict()
+
+    def _day_indices(self, start=None, end=None):
+        result = list()
+        for day_path in day_directories(self.path):
+            day_index = self.days.get(day_path)
+            if day_index is None:
+                day_index = DayIndex(day_path)
+                self.days[day_path] = day_index
+            elif day_index.day.records.shape[0] != self._record_count(day_path):
+                day_index.open()
+            if day_index.overlaps(start, end):
+                result.append(day_index)
+        return result
+
+    @staticmethod
+    def _record_count(day_path):
+        filename = os.path.join(day_path, RECORDS_FILENAME)
+        return os.path.getsize(filename) // RECORD_DTYPE.itemsize if os.path.exists(filename) else 0
+
+    def attributes(self):
+        names = set()
+        for day_index in self._day_indices():
+            names.update(day_index.day.attributes)
+        return sorted(names)
+
+    def query(self, name, start=None, end=None, max_points=None):
+        """ Timestamps and values of attribute name between start and end (s since epoch).
+
+        Numbers, booleans and states are returned as a float64 array, strings as an object
+        array and spectra as a 2D float32 array (one row per spectrum, they should have the same
+        length). With max_points set,
+        every n:th value is returned so that there are at most max_points.
+        """
+        parts = list()
+        for day_index in self._day_indices(start, end):
+            pos = day_index.positions(name, start, end)
+            if pos.shape[0] > 0:
+                parts.append((day_index.day, pos))
+        n = sum(pos.shape[0] for day, pos in parts)
+        step = 1
+        if max_points is not None and n > max_points:
+            step = -(-n // max_points)
+        t_parts = list()
+        v_parts = list()
+        t_last = None
+        for day, pos in parts:
+            recs = day.records[pos[::step]]
+            if t_last is not None:
+                # Skip the values repeated at the start of each day
+                recs = recs[recs["time"] > t_last]
+            if recs.shape[0] == 0:
+                continue
+            t_last = recs["time"][-1]
+            t_parts.append(np.asarray(recs["time"]))
+            kinds = recs["kind"]
+            if kinds.shape[0] > 0 and kinds[0] in (KIND_STRING, KIND_SPECTRUM):
+                values = [day.value(rec) for rec in recs]
+                if kinds[0] == KIND_STRING:
+                    v_parts.append(np.array(values, dtype=object))
+                else:
+                    v_parts.append(values)
+            else:
+                v_parts.append(np.asarray(recs["value"]))
+        if len(t_parts) == 0:
+            return np.zeros(0), np.zeros(0)
+        t = np.concatenate(t_parts)
+        if isinstance(v_parts[0], list):
+            v = np.vstack([row for part in v_parts for row in part])
+        else:
+            v = np.concatenate(v_parts)
+        return t, v
+
+    def value_at(self, name, times):
+        """ Value of a scalar attribute at each of times, as the latest recorded value at or before
+        that time (NaN before the first value).
+
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if times.shape[0] == 0:
+            return np.zeros(0)
+        t, v = self.query(name, times[0], times[-1])
+        v = np.asarray(v, dtype=np.float64)
+        # Latest value at or before times[0]. Each day of a recording starts with the latest
+        # value of every attribute, so it is in the newest day that starts before times[0],
+        # however long ago it was last changed.
+        for day_index in reversed(self._day_indices()):
+            if day_index.t_min is None or day_index.t_min > times[0]:
+                continue
+            pos = day_index.positions(name, None, times[0])
+            if pos.shape[0] > 0:
+                rec = day_index.day.records[pos[-1]]
+                t = np.concatenate(([rec["time"]], t))
+                v = np.concatenate(([float(day_index.day.value(rec))], v))
+                break
+        if t.shape[0] == 0:
+            return np.full(times.shape, np.nan)
+        i = np.searchsorted(t, times, side="right") - 1
+        result = v[np.maximum(i, 0)]
+        result[i < 0] = np.nan
+        return result
+
+    def intervals(self, name, condition, start=None, end=None):
+        """ Periods where condition(values) holds for a scalar attribute, as an (n, 2) array of
+        start and end times. condition gets the value array and returns a boolean array.
+
+        """
+        t, v = self.query(name, start, end)
+        if t.shape[0] == 0:
+            return np.zeros((0, 2))
+        active = np.asarray(condition(v), dtype=np.int8)
+        edges = np.diff(np.concatenate(([0], active, [0])))
+        i_start = np.flatnonzero(edges == 1)
+        i_end = np.flatnonzero(edges == -1)
+        # A period ends at the first sample where the condition no longer holds
+        t_end = np.append(t, t[-1] if end is None else max(end, t[-1]))[i_end]
+        return np.column_stack((t[i_start], t_end))
@@ -0,0 +1,55 @@
+"""
+Frame coalescing of widget updates.
+
+Read callbacks that arrive between two display frames only store their latest value. Once per
+frame all pending values are applied in one pass, so each widget is repainted at most once per
+frame regardless of how many attribute updates arrived.
+
+:created: 2026-10-17
+"""
+
+from PyQt5 import QtCore
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCoalescer(QtCore.QObject):
+    """ Collects the latest value per key and applies them at frame_rate.
+
+    The frame timer only runs while there are pending values, so an idle GUI gets no wakeups.
+
+    """
+    def __init__(self, frame_rate=30.0, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self.pending = OrderedDict()
+        self.frame_count = 0
+        self.applied_count = 0
+        self.submitted_count = 0
+        self.frame_timer = QtCore.QTimer(self)
+        self.frame_timer.timeout.connect(self.apply_pending)
+        self.set_frame_rate(frame_rate)
+
+    def set_frame_rate(self, frame_rate):
+        self.frame_timer.setInterval(int(1000.0 / frame_rate))
+
+    def submit(self, key, slot, data):
+        self.submitted_count += 1
+        self.pending[key] = (slot, data)
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def apply_pending(self):
+        if len(self.pending) == 0:
+            self.frame_timer.stop()
+            return
+        pending = self.pending
+        self.pending = OrderedDict()
+        self.frame_count += 1
+        for slot, data in pending.values():
+            try:
+                slot(data)
+            except Exception:
+                logger.exception("Error in update slot {0}".format(slot))
+            self.applied_count += 1
@@ -0,0 +1,634 @@
+"""
+Simulated Tango devices for running the GUIs without the lasers.
+
+All devices used by astrella_control5.py and entrance_screen.py are started in one process
+without a Tango database:
+
+    python simulated_devices.py --port 45450 --latency 0.005 --jitter 0.005
+
+and the GUIs are started with --sim localhost:45450 to use them instead of the real devices.
+
+The devices have the same attributes and commands as the real ones, with values drifting
+around typical operating points (Ornstein-Uhlenbeck noise) and reacting to the commands, e.g.
+the Verdi power goes to zero on laser_disable and the Vitara loses modelock now and then and
+gets it back on goto_kickstart_pos.
+
+Every device has the attributes sim_latency, sim_jitter (s), sim_failure_rate (probability of a
+failed read or command) and sim_offline, which can be written while the simulation is running.
+The start values are set with the command line options. Reads and writes of these sim_*
+attributes never fail, so that the failures can be switched off again.
+
+With --step-interval set, the values only change at multiples of the step interval and are
+timestamped with the time of the change instead of the time of the read. The attribute time
+then tells when the value changed at the source, which latency_benchmark.py uses.
+
+:created: 2026-10-17
+"""
+
+import functools
+import argparse
+import logging
+import random
+import math
+import time
+import numpy as np
+import tango as pt
+from tango.server import Device, attribute, command, device_property
+from tango.test_context import MultiDeviceTestContext
+
+logger = logging.getLogger(__name__)
+
+SIM_PORT = 45450
+
+
+class Drift(object):
+    """ Ornstein-Uhlenbeck noise around mean with rms sigma and correlation time tau (s).
+
+    """
+    def __init__(self, mean, sigma, tau=10.0):
+        self.mean = mean
+        self.sigma = sigma
+        self.tau = tau
+        self.x = 0.0
+        self.t = time.monotonic()
+
+    def value(self, mean=None):
+        now = time.monotonic()
+        a = math.exp(-(now - self.t) / self.tau)
+        self.t = now
+        self.x = self.x * a + self.sigma * math.sqrt(1 - a * a) * random.gauss(0.0, 1.0)
+        return (self.mean if mean is None else mean) + self.x
+
+
+class SimAttr(object):
+    """ Description of a simulated attribute. The value is read from the device method simulate_<name>
+    and writes are stored in device.setpoints[name].
+
+    """
+    def __init__(self, name, dtype=pt.DevDouble, unit="", fmt="%.2f", writable=False, dim_x=0,
+                 min_value=None, max_value=None):
+        self.name = name
+        self.dtype = dtype
+        self.unit = unit
+        self.fmt = fmt
+        self.writable = writable
+        self.dim_x = dim_x
+        self.min_value = min_value
+        self.max_value = max_value
+
+
+def sim_command(method):
+    """ Like the tango.server command decorator, with failure injection before the command.
+
+    """
+    @functools.wraps(method)
+    def inject_and_run(self):
+        self.inject_failure()
+        return method(self)
+    return command(inject_and_run)
+
+
+class SimulatedDevice(Device):
+    """ Base class with latency and jitter applied to every request, and failure injection applied
+    to the reads and writes of the simulated attributes, state, status and the commands.
+
+    """
+    latency = device_property(dtype=float, default_value=0.0)
+    jitter = device_property(dtype=float, default_value=0.0)
+    failure_rate = device_property(dtype=float, default_value=0.0)
+    step_interval = device_property(dtype=float, default_value=0.0)
+
+    SIM_ATTRIBUTES = []
+
+    def init_device(self):
+        if hasattr(self, "sim_failure_rate_value"):
+            # Re-initialised by the Init command
+            self.inject_failure()
+        Device.init_device(self)
+        self.sim_latency_value = self.latency
+        self.sim_jitter_value = self.jitter
+        self.sim_failure_rate_value = self.failure_rate
+        self.sim_offline_value = False
+        self.setpoints = dict()
+        # Attribute name: (time of last step, value)
+        self.step_values = dict()
+        self.set_state(pt.DevState.ON)
+        self.set_status("Simulated device running")
+
+    def initialize_dynamic_attributes(self):
+        for sim_attr in self.SIM_ATTRIBUTES:
+            access = pt.AttrWriteType.READ_WRITE if sim_attr.writable else pt.AttrWriteType.READ
+            if sim_attr.dim_x > 0:
+                attr = pt.SpectrumAttr(sim_attr.name, sim_attr.dtype, access, sim_attr.dim_x)
+            else:
+                attr = pt.Attr(sim_attr.name, sim_attr.dtype, access)
+            props = pt.UserDefaultAttrProp()
+            props.set_unit(sim_attr.unit)
+            props.set_format(sim_attr.fmt)
+            if sim_attr.min_value is not None:
+                props.set_min_value(str(sim_attr.min_value))
+            if sim_attr.max_value is not None:
+                props.set_max_value(str(sim_attr.max_value))
+            attr.set_default_properties(props)
+            w_meth = self.write_sim_attribute if sim_attr.writable else None
+            self.add_attribute(attr, self.read_sim_attribute, w_meth)
+
+    def always_executed_hook(self):
+        delay = self.sim_latency_value + random.uniform(0.0, self.sim_jitter_value)
+        if delay > 0:
+            time.sleep(delay)
+
+    def inject_failure(self):
+        if self.sim_offline_value or random.random() < self.sim_failure_rate_value:
+            pt.Except.throw_exception("SIM_Failure", "Simulated failure of {0}".format(self.get_name()),
+                                      "SimulatedDevice.inject_failure")
+
+    def dev_state(self):
+        self.inject_failure()
+        return Device.dev_state(self)
+
+    def dev_status(self):
+        self.inject_failure()
+        return Device.dev_status(self)
+
+    def read_sim_attribute(self, attr):
+        self.inject_failure()
+        name = attr.get_name()
+        if self.step_interval <= 0:
+            attr.set_value(getattr(self, "simulate_" + name)())
+            return
+        t_step = math.floor(time.time() / self.step_interval) * self.step_interval
+        step = self.step_values.get(name)
+        if step is None or step[0] != t_step:
+            step = (t_step, getattr(self, "simulate_" + name)())
+            self.step_values[name] = step
+        attr.set_value_date_quality(step[1], step[0], pt.AttrQuality.ATTR_VALID)
+
+    def write_sim_attribute(self, attr):
+        self.inject_failure()
+        self.setpoints[attr.get_name()] = attr.get_write_value()
+
+    @attribute(dtype=float, access=pt.AttrWriteType.READ_WRITE, unit="s")
+    def sim_latency(self):
+        return self.sim_latency_value
+
+    @sim_latency.write
+    def sim_latency(self, value):
+        self.sim_latency_value = value
+
+    @attribute(dtype=float, access=pt.AttrWriteType.READ_WRITE, unit="s")
+    def sim_jitter(self):
+        return self.sim_jitter_value
+
+    @sim_jitter.write
+    def sim_jitter(self, value):
+        self.sim_jitter_value = value
+
+    @attribute(dtype=float, access=pt.AttrWriteType.READ_WRITE)
+    def sim_failure_rate(self):
+        return self.sim_failure_rate_value
+
+    @sim_failure_rate.write
+    def sim_failure_rate(self, value):
+        self.sim_failure_rate_value = value
+
+    @attribute(dtype=bool, access=pt.AttrWriteType.READ_WRITE)
+    def sim_offline(self):
+        return self.sim_offline_value
+
+    @sim_offline.write
+    def sim_offline(self, value):
+        self.sim_offline_value = value
+
+
+class VerdiSim(SimulatedDevice):
+    """ Coherent Verdi pump laser of the Vitara oscillator.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("power", unit="W", writable=True, min_value=0, max_value=8),
+                      SimAttr("diode_current", unit="A", min_value=0, max_value=60),
+                      SimAttr("temperature_main", unit="degC")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.setpoints["power"] = 5.5
+        self.enabled = True
+        self.power_drift = Drift(0.0, 0.01, 5.0)
+        self.temp_drift = Drift(25.0, 0.05, 60.0)
+        self.set_status("Laser enabled, shutter open")
+
+    def simulate_power(self):
+        return max(0.0, self.power_drift.value(self.setpoints["power"])) if self.enabled else 0.0
+
+    def simulate_diode_current(self):
+        return 30.0 + 4.0 * self.setpoints["power"] if self.enabled else 0.0
+
+    def simulate_temperature_main(self):
+        return self.temp_drift.value()
+
+    @sim_command
+    def laser_enable(self):
+        self.enabled = True
+        self.set_state(pt.DevState.ON)
+        self.set_status("Laser enabled")
+
+    @sim_command
+    def laser_disable(self):
+        self.enabled = False
+        self.set_state(pt.DevState.OFF)
+        self.set_status("Laser disabled")
+
+    @sim_command
+    def open_shutter(self):
+        self.set_status("Shutter open")
+
+    @sim_command
+    def close_shutter(self):
+        self.set_status("Shutter closed")
+
+    @sim_command
+    def remote_enable(self):
+        self.set_status("Remote enabled")
+
+    @sim_command
+    def remote_disable(self):
+        self.set_status("Remote disabled")
+
+
+class RevolutionSim(SimulatedDevice):
+    """ Coherent Revolution pump laser of the regenerative amplifier.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("pd_power", unit="W", min_value=0, max_value=60),
+                      SimAttr("diode_current", unit="A", writable=True, min_value=0, max_value=40),
+                      SimAttr("diode_current_actual", unit="A", min_value=0, max_value=40),
+                      SimAttr("head_temp", unit="degC")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.setpoints["diode_current"] = 28.0
+        self.laser_on = True
+        self.power_drift = Drift(0.0, 0.1, 10.0)
+        self.temp_drift = Drift(22.0, 0.05, 60.0)
+        self.set_status("Laser on, operating")
+
+    def simulate_diode_current(self):
+        return self.setpoints["diode_current"]
+
+    def simulate_diode_current_actual(self):
+        return self.setpoints["diode_current"] + random.gauss(0.0, 0.01) if self.laser_on else 0.0
+
+    def simulate_pd_power(self):
+        return max(0.0, self.power_drift.value(1.6 * self.setpoints["diode_current"])) if self.laser_on else 0.0
+
+    def simulate_head_temp(self):
+        return self.temp_drift.value()
+
+    @sim_command
+    def on(self):
+        self.laser_on = True
+        self.set_state(pt.DevState.ON)
+        self.set_status("Laser on")
+
+    @sim_command
+    def off(self):
+        self.laser_on = False
+        self.set_state(pt.DevState.OFF)
+        self.set_status("Laser off")
+
+    @sim_command
+    def set_operating(self):
+        self.set_status("Laser on, operating")
+
+
+class VitaraSim(SimulatedDevice):
+    """ Coherent Vitara oscillator. Loses modelock now and then, kickstart restores it.
+
+    """
+    modelock_loss_rate = device_property(dtype=float, default_value=1.0 / 600)
+
+    SIM_ATTRIBUTES = [SimAttr("power", unit="mW", min_value=0, max_value=1000),
+                      SimAttr("pd_power", unit="V"),
+                      SimAttr("modelock_status", dtype=pt.DevBoolean, fmt="%s"),
+                      SimAttr("rasterizing_status", dtype=pt.DevBoolean, fmt="%s")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.modelocked = True
+        self.last_check = time.monotonic()
+        self.power_drift = Drift(600.0, 5.0, 10.0)
+        self.set_status("Modelocked")
+
+    def _update_modelock(self):
+        now = time.monotonic()
+        if self.modelocked and random.random() < self.modelock_loss_rate * (now - self.last_check):
+            self.modelocked = False
+            self.set_state(pt.DevState.ALARM)
+            self.set_status("Modelock lost")
+        self.last_check = now
+
+    def simulate_power(self):
+        self._update_modelock()
+        return self.power_drift.value() * (1.0 if self.modelocked else 0.8)
+
+    def simulate_pd_power(self):
+        return self.simulate_power() * 4e-3
+
+    def simulate_modelock_status(self):
+        self._update_modelock()
+        return self.modelocked
+
+    def simulate_rasterizing_status(self):
+        return not self.modelocked
+
+    @sim_command
+    def goto_kickstart_pos(self):
+        self.modelocked = True
+        self.set_state(pt.DevState.ON)
+        self.set_status("Modelocked")
+
+    @sim_command
+    def goto_operating_pos(self):
+        self.set_status("Operating position")
+
+    @sim_command
+    def starter_on(self):
+        self.set_status("Starter on")
+
+    @sim_command
+    def starter_off(self):
+        self.set_status("Starter off")
+
+
+class SpectrometerSim(SimulatedDevice):
+    """ Spectrometer with a Gaussian spectrum drifting in centre wavelength and width.
+
+    """
+    center_wavelength = device_property(dtype=float, default_value=800.0)
+    n_pixels = 2048
+
+    SIM_ATTRIBUTES = [SimAttr("spectrum", dim_x=n_pixels, fmt="%.1f"),
+                      SimAttr("wavelengths", unit="nm", dim_x=n_pixels),
+                      SimAttr("peakwavelength", unit="nm", min_value=700, max_value=900),
+                      SimAttr("peakwidth", unit="nm", min_value=0, max_value=100)]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.x = np.linspace(self.center_wavelength - 150, self.center_wavelength + 150, self.n_pixels)
+        self.center_drift = Drift(self.center_wavelength, 0.5, 30.0)
+        self.width_drift = Drift(40.0, 1.0, 30.0)
+        self.center = self.center_wavelength
+        self.width = 40.0
+
+    def simulate_spectrum(self):
+        self.center = self.center_drift.value()
+        self.width = self.width_drift.value()
+        sigma = self.width / 2.355
+        y = 1000.0 * np.exp(-0.5 * ((self.x - self.center) / sigma) ** 2)
+        return y + np.random.normal(10.0, 3.0, self.n_pixels)
+
+    def simulate_wavelengths(self):
+        return self.x
+
+    def simulate_peakwavelength(self):
+        return self.center
+
+    def simulate_peakwidth(self):
+        return self.width
+
+
+class SdgSim(SimulatedDevice):
+    """ Delay generator of the regenerative amplifier.
+
+    """
+    @sim_command
+    def reset(self):
+        self.set_state(pt.DevState.ON)
+        self.set_status("Reset done")
+
+
+class SynchrolockSim(SimulatedDevice):
+    """ Coherent Synchrolock AP locking the oscillator to the RF reference.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("error_frequency_abs", unit="Hz", fmt="%.1f"),
+                      SimAttr("fund_enabled", dtype=pt.DevBoolean, fmt="%s", writable=True),
+                      SimAttr("harm_enabled", dtype=pt.DevBoolean, fmt="%s", writable=True),
+                      SimAttr("fund_phase_error", unit="deg", fmt="%.3f"),
+                      SimAttr("harm_phase_error", unit="deg", fmt="%.3f"),
+                      SimAttr("fund_phase_shift", unit="deg", writable=True),
+                      SimAttr("harm_phase_shift", unit="deg", writable=True),
+                      SimAttr("picomotor_pos", dtype=pt.DevLong, fmt="%d", writable=True)]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.setpoints.update({"fund_enabled": True, "harm_enabled": True, "fund_phase_shift": 0.0,
+                               "harm_phase_shift": 0.0, "picomotor_pos": 0})
+        self.ferr_drift = Drift(0.0, 2.0, 5.0)
+        self.fund_drift = Drift(0.0, 0.05, 1.0)
+        self.harm_drift = Drift(0.0, 0.2, 1.0)
+        self.set_status("Locked")
+
+    def simulate_error_frequency_abs(self):
+        return abs(self.ferr_drift.value())
+
+    def simulate_fund_enabled(self):
+        return self.setpoints["fund_enabled"]
+
+    def simulate_harm_enabled(self):
+        return self.setpoints["harm_enabled"]
+
+    def simulate_fund_phase_error(self):
+        # Unlocked loops wander much further
+        return self.fund_drift.value() * (1.0 if self.setpoints["fund_enabled"] else 100.0)
+
+    def simulate_harm_phase_error(self):
+        return self.harm_drift.value() * (1.0 if self.setpoints["harm_enabled"] else 100.0)
+
+    def simulate_fund_phase_shift(self):
+        return self.setpoints["fund_phase_shift"]
+
+    def simulate_harm_phase_shift(self):
+        return self.setpoints["harm_phase_shift"]
+
+    def simulate_picomotor_pos(self):
+        return self.setpoints["picomotor_pos"]
+
+
+class ShutterSim(SimulatedDevice):
+    """ THG beam shutter.
+
+    """
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.set_state(pt.DevState.CLOSE)
+        self.set_status("Shutter closed")
+
+    @sim_command
+    def open_shutter(self):
+        self.set_state(pt.DevState.OPEN)
+        self.set_status("Shutter open")
+
+    @sim_command
+    def close_shutter(self):
+        self.set_state(pt.DevState.CLOSE)
+        self.set_status("Shutter closed")
+
+
+class EnergySim(SimulatedDevice):
+    """ IR and UV pulse energy of the third harmonic generation.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("ir_energy", unit="J", fmt="%.2e"),
+                      SimAttr("uv_energy", unit="J", fmt="%.2e")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.ir_drift = Drift(2.5e-3, 2e-5, 10.0)
+        self.uv_drift = Drift(2.5e-4, 5e-6, 10.0)
+
+    def simulate_ir_energy(self):
+        return self.ir_drift.value()
+
+    def simulate_uv_energy(self):
+        return self.uv_drift.value()
+
+
+class RedPitayaSim(SimulatedDevice):
+    """ Red Pitaya used as an energy meter, measurementdata1/2 in J.
+
+    """
+    energy = device_property(dtype=float, default_value=1e-3)
+
+    SIM_ATTRIBUTES = [SimAttr("measurementdata1", unit="J", fmt="%.2e"),
+                      SimAttr("measurementdata2", unit="J", fmt="%.2e")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.drift1 = Drift(self.energy, 0.01 * self.energy, 10.0)
+        self.drift2 = Drift(self.energy, 0.01 * self.energy, 10.0)
+
+    def simulate_measurementdata1(self):
+        return self.drift1.value()
+
+    def simulate_measurementdata2(self):
+        return self.drift2.value()
+
+
+class HalcyonSim(SimulatedDevice):
+    """ Halcyon oscillator lock of the gun laser.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("errorfrequency", unit="Hz", fmt="%.1f"),
+                      SimAttr("jitter", unit="fs", fmt="%.1f"),
+                      SimAttr("modelocked", dtype=pt.DevBoolean, fmt="%s")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.ferr_drift = Drift(0.0, 1.0, 5.0)
+        self.jitter_drift = Drift(50.0, 5.0, 10.0)
+
+    def simulate_errorfrequency(self):
+        return self.ferr_drift.value()
+
+    def simulate_jitter(self):
+        return abs(self.jitter_drift.value())
+
+    def simulate_modelocked(self):
+        return True
+
+
+class CryoSim(SimulatedDevice):
+    """ Cryo cooler temperature of an amplifier crystal.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("temperature", unit="K", fmt="%.1f")]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.temp_drift = Drift(80.0, 0.2, 60.0)
+
+    def simulate_temperature(self):
+        return self.temp_drift.value()
+
+
+class FinesseSim(SimulatedDevice):
+    """ Laser Quantum Finesse pump laser of the gun laser.
+
+    """
+    SIM_ATTRIBUTES = [SimAttr("power", unit="W", min_value=0, max_value=10)]
+
+    def init_device(self):
+        SimulatedDevice.init_device(self)
+        self.power_drift = Drift(4.5, 0.01, 5.0)
+
+    def simulate_power(self):
+        return self.power_drift.value()
+
+
+class PataraSim(SimulatedDevice):
+    """ Patara pump laser of the gun laser amplifier.
+
+    """
+    pass
+
+
+# Device class and device names of every device used by the GUIs
+SIM_DEVICES = [(VerdiSim, ["astrella/oscillator/verdi"], {}),
+               (RevolutionSim, ["astrella/regen/revolution"], {}),
+               (VitaraSim, ["astrella/oscillator/vitara"], {}),
+               (SpectrometerSim, ["astrella/oscillator/spectrometer"], {}),
+               (SpectrometerSim, ["gunlaser/oscillator/spectrometer"], {"center_wavelength": 780.0}),
+               (SdgSim, ["astrella/regen/sdg"], {}),
+               (SynchrolockSim, ["astrella/oscillator/synchrolock"], {}),
+               (ShutterSim, ["gunlaser/thg/shutter"], {}),
+               (EnergySim, ["gunlaser/thg/energy"], {}),
+               (RedPitayaSim, ["gunlaser/devices/redpitaya1", "gunlaser/devices/redpitaya2"], {"energy": 2e-3}),
+               (RedPitayaSim, ["gunlaser/devices/redpitaya4"], {"energy": 20e-3}),
+               (RedPitayaSim, ["testlaser/devices/redpitaya5"], {"energy": 3e-3}),
+               (HalcyonSim, ["gunlaser/oscillator/halcyon_raspberry"], {}),
+               (CryoSim, ["gunlaser/mp/temperature", "gunlaser/regen/temperature"], {}),
+               (FinesseSim, ["gunlaser/oscillator/finesse"], {}),
+               (PataraSim, ["gunlaser/devices/patara"], {})]
+
+
+def devices_info(latency=0.0, jitter=0.0, failure_rate=0.0, step_interval=0.0):
+    """ devices_info argument of MultiDeviceTestContext for all simulated devices.
+
+    """
+    info = dict()
+    for device_class, names, properties in SIM_DEVICES:
+        props = {"latency": latency, "jitter": jitter, "failure_rate": failure_rate, "step_interval": step_interval}
+        props.update(properties)
+        info.setdefault(device_class, list()).extend({"name": name, "properties": props} for name in names)
+    return [{"class": device_class, "devices": devices} for device_class, devices in info.items()]
+
+
+def start_context(host="localhost", port=SIM_PORT, latency=0.0, jitter=0.0, failure_rate=0.0, step_interval=0.0,
+                  process=False):
+    """ Returns a MultiDeviceTestContext serving all simulated devices. Use it as a context manager.
+
+    """
+    return MultiDeviceTestContext(devices_info(latency, jitter, failure_rate, step_interval), server_name="AstrellaSim",
+                                  instance_name="sim", host=host, port=port, process=process)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated Tango devices for the Astrella GUIs")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=SIM_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay of every read and command (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay up to this (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a failed read or command")
+    parser.add_argument("--step-interval", type=float, default=0.0,
+                        help="Change values only every step interval (s), timestamped with the change")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with start_context(args.host, args.port, args.latency, args.jitter, args.failure_rate, args.step_interval):
+        logger.info("Simulated devices running on {0}:{1}, start the GUIs with --sim {0}:{1}".format(
+            args.host, args.port))
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,204 @@
+"""
+Helpers for plotting spectrometer spectra.
+
+SpectrumDecimator crops a spectrum to the plotted wavelength range and reduces it to one
+min/max pair per pixel, so that the plot cost does not depend on the spectrometer resolution.
+Peaks are kept since both the minimum and maximum of each pixel column are drawn.
+
+WavelengthAxisCache holds the wavelength axis of a spectrometer and requests a new read of it
+when a spectrum of a different length arrives. Spectra arriving without a matching axis are
+kept until the axis has been read.
+
+Spectra are handled as contiguous NumPy arrays without list conversions, and the decimated
+output is written into two preallocated buffers used alternately, so that a spectrum update
+does not allocate new arrays. Two buffers are needed since the plot keeps a reference to the
+array it is showing.
+
+:created: 2026-10-17
+"""
+
+from collections import deque
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SpectrumDecimator(object):
+    """ Crop to x_range and min/max reduce to width pixels.
+
+    The crop slice and the pixel bins are computed once when the x axis, range or width
+    changes. The x axis is assumed to be increasing.
+
+    :param x_range: (x_min, x_max) of the plot, None to keep the full spectrum
+    :param width: Plot width in pixels
+    """
+    def __init__(self, x_range=None, width=500):
+        self.x_range = x_range
+        self.width = width
+        self.x = None
+        self.crop = slice(None)
+        self.starts = None
+        self.x_out = None
+        self.buffers = list()
+        self.buffer_index = 0
+
+    def set_x_range(self, x_min, x_max):
+        if self.x_range != (x_min, x_max):
+            self.x_range = (x_min, x_max)
+            self._update_bins()
+
+    def set_width(self, width):
+        width = max(1, int(width))
+        if width != self.width:
+            self.width = width
+            self._update_bins()
+
+    def set_x(self, x):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self._update_bins()
+
+    def _update_bins(self):
+        if self.x is None:
+            return
+        if self.x_range is None:
+            self.crop = slice(0, self.x.shape[0])
+        else:
+            i0, i1 = np.searchsorted(self.x, self.x_range)
+            # Keep one point outside each end so that the curve reaches the plot edges
+            self.crop = slice(max(0, i0 - 1), min(self.x.shape[0], i1 + 1))
+        x_crop = self.x[self.crop]
+        n = x_crop.shape[0]
+        if n <= 2 * self.width:
+            self.starts = None
+            self.x_out = x_crop
+            return
+        self.starts = np.linspace(0, n, self.width + 1).astype(np.intp)
+        ends = self.starts[1:] - 1
+        self.starts = self.starts[:-1]
+        self.x_out = np.empty(2 * self.width)
+        self.x_out[0::2] = x_crop[self.starts]
+        self.x_out[1::2] = x_crop[ends]
+        self.buffers = list()
+
+    def _next_buffer(self, dtype):
+        if len(self.buffers) == 0 or self.buffers[0].dtype != dtype:
+            self.buffers = [np.empty(2 * self.width, dtype=dtype) for i in range(2)]
+        self.buffer_index = 1 - self.buffer_index
+        return self.buffers[self.buffer_index]
+
+    def decimate(self, y):
+        """ Returns x, y arrays to plot for the spectrum y.
+
+        """
+        # No copy if the spectrum already is a contiguous array, as read by tango
+        y = np.ascontiguousarray(y)
+        if self.x is None or y.shape[0] != self.x.shape[0]:
+            logger.debug("Spectrum length {0} does not match x axis, not decimated".format(y.shape[0]))
+            return self.x, y
+        y_crop = y[self.crop]
+        if self.starts is None:
+            return self.x_out, y_crop
+        y_out = self._next_buffer(y.dtype)
+        np.minimum.reduceat(y_crop, self.starts, out=y_out[0::2])
+        np.maximum.reduceat(y_crop, self.starts, out=y_out[1::2])
+        return self.x_out, y_out
+
+
+class WavelengthAxisCache(object):
+    """ Wavelength axis keyed on its length and a hash of its values.
+
+    :param fetch_callback: Called without arguments to request a new read of the axis. The result
+                           should be passed to set_axis.
+    :param max_pending: Number of spectra kept while waiting for the axis
+    :param refetch_interval: Shortest time (s) between two axis requests
+    """
+    def __init__(self, fetch_callback, max_pending=10, refetch_interval=1.0):
+        self.fetch_callback = fetch_callback
+        self.refetch_interval = refetch_interval
+        self.axis = None
+        self.key = None
+        self.pending = deque(maxlen=max_pending)
+        self.request_time = None
+
+    def request(self):
+        """ Request a new read of the axis, e.g. after a configuration change.
+
+        """
+        self.request_time = time.monotonic()
+        self.fetch_callback()
+
+    def accept(self, data):
+        """ Returns True if the spectrum data matches the current axis. Otherwise the spectrum is
+        kept for later and a new axis is requested.
+
+        """
+        if self.axis is not None and len(data.value) == self.axis.shape[0]:
+            return True
+        self.pending.append(data)
+        if self.request_time is None or time.monotonic() - self.request_time > self.refetch_interval:
+            logger.info("No wavelength axis for spectrum length {0}, reading axis".format(len(data.value)))
+            self.request()
+        return False
+
+    def set_axis(self, x):
+        """ Store a newly read axis. Returns True if it differs from the previous one.
+
+        """
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        key = (x.shape[0], hash(x.tobytes()))
+        self.request_time = None
+        if key == self.key:
+            return False
+        self.key = key
+        self.axis = x
+        return True
+
+    def take_pending(self):
+        """ Returns the kept spectra that match the current axis, oldest first.
+
+        """
+        pending = [d for d in self.pending if self.axis is not None and len(d.value) == self.axis.shape[0]]
+        self.pending.clear()
+        return pending
+
+
+def spectrum_peak(x, y):
+    """ Centroid and FWHM of the main peak of a spectrum.
+
+    The baseline is the spectrum minimum. The half maximum crossings on each side of the
+    highest point are linearly interpolated, and the centroid is taken over the points above
+    half maximum. Returns (centroid, fwhm), or (None, None) for an empty or flat spectrum.
+
+    :param x: Increasing x axis (wavelengths)
+    :param y: Spectrum, same length as x
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if y.shape[0] < 3 or y.shape[0] != x.shape[0]:
+        return None, None
+    i_max = int(np.argmax(y))
+    y = y - y.min()
+    half = 0.5 * y[i_max]
+    if half <= 0:
+        return None, None
+    below = y < half
+    left = np.flatnonzero(below[:i_max])
+    right = np.flatnonzero(below[i_max:])
+    i0 = left[-1] if left.shape[0] > 0 else 0
+    i1 = i_max + right[0] if right.shape[0] > 0 else y.shape[0] - 1
+    x_left = _crossing(x, y, i0, i0 + 1, half) if left.shape[0] > 0 else x[0]
+    x_right = _crossing(x, y, i1 - 1, i1, half) if right.shape[0] > 0 else x[-1]
+    # Points above half maximum, up to the spectrum edge on a side without a crossing
+    i_start = i0 + 1 if left.shape[0] > 0 else 0
+    i_end = i1 if right.shape[0] > 0 else y.shape[0]
+    w = y[i_start:i_end]
+    if w.sum() <= 0:
+        return None, None
+    centroid = np.dot(x[i_start:i_end], w) / w.sum()
+    return float(centroid), float(x_right - x_left)
+
+
+def _crossing(x, y, i0, i1, level):
+    return x[i0] + (level - y[i0]) * (x[i1] - x[i0]) / (y[i1] - y[i0])
@@ -0,0 +1,111 @@
+"""
+Strip chart window for the attribute history.
+
+Plots one of the attributes recorded in an AttributeHistory over a selectable time span. The
+plot is refreshed once per second while the window is shown.
+
+The data is requested for the visible time range with about two points per pixel, so the
+history picks a downsampled level for long spans. After zooming or panning with the mouse the
+plot stays on the chosen range and the data is requested again for it. Selecting a time span
+follows the latest values again.
+
+:created: 2026-10-17
+"""
+
+from PyQt5 import QtCore, QtWidgets
+import logging
+import time
+import pyqtgraph as pg
+
+logger = logging.getLogger(__name__)
+
+TIME_SPANS = [("1 min", 60.0), ("10 min", 600.0), ("1 h", 3600.0), ("4 h", 14400.0), ("All", None)]
+
+
+class StripChart(QtWidgets.QWidget):
+    """ Plot of one attribute of history against time.
+
+    :param history: AttributeHistory with the recorded attributes
+    :param refresh_interval: Time between plot updates (s)
+    """
+    def __init__(self, history, refresh_interval=1.0, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+        self.setWindowTitle("Attribute history")
+        self.history = history
+
+        self.attr_combo = QtWidgets.QComboBox()
+        self.attr_combo.setSizeAdjustPolicy(QtWidgets.QComboBox.AdjustToContents)
+        self.attr_combo.currentIndexChanged.connect(self.update_plot)
+        self.span_combo = QtWidgets.QComboBox()
+        for name, span in TIME_SPANS:
+            self.span_combo.addItem(name, span)
+        self.span_combo.setCurrentIndex(1)
+        self.span_combo.currentIndexChanged.connect(self.follow_latest)
+
+        self.plot_widget = pg.PlotWidget(axisItems={"bottom": pg.DateAxisItem()})
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.curve = self.plot_widget.plot([], [])
+        self.view_box = self.plot_widget.getViewBox()
+        self.view_box.sigXRangeChanged.connect(self.range_changed)
+        # Wait for the mouse zoom or pan to settle before reading new data
+        self.range_timer = QtCore.QTimer(self)
+        self.range_timer.setSingleShot(True)
+        self.range_timer.setInterval(100)
+        self.range_timer.timeout.connect(self.update_plot)
+
+        top_layout = QtWidgets.QHBoxLayout()
+        top_layout.addWidget(self.attr_combo)
+        top_layout.addWidget(self.span_combo)
+        top_layout.addStretch()
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(top_layout)
+        layout.addWidget(self.plot_widget)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(int(1000 * refresh_interval))
+        self.refresh_timer.timeout.connect(self.update_plot)
+
+    def update_attribute_list(self):
+        current = self.attr_combo.currentText()
+        keys = self.history.keys()
+        if keys == [self.attr_combo.itemText(i) for i in range(self.attr_combo.count())]:
+            return
+        self.attr_combo.blockSignals(True)
+        self.attr_combo.clear()
+        self.attr_combo.addItems(keys)
+        if current in keys:
+            self.attr_combo.setCurrentIndex(keys.index(current))
+        self.attr_combo.blockSignals(False)
+
+    def follow_latest(self):
+        self.view_box.enableAutoRange(x=True)
+        self.update_plot()
+
+    def range_changed(self):
+        # Only ranges set by the user, not the auto range following setData
+        if not self.view_box.autoRangeEnabled()[0]:
+            self.range_timer.start()
+
+    def update_plot(self):
+        self.update_attribute_list()
+        key = self.attr_combo.currentText()
+        if key == "":
+            return
+        if self.view_box.autoRangeEnabled()[0]:
+            span = self.span_combo.currentData()
+            since = time.time() - span if span is not None else None
+            until = None
+        else:
+            since, until = self.view_box.viewRange()[0]
+        max_points = 2 * max(100, self.plot_widget.width())
+        t, v = self.history.get(key, since, until, max_points)
+        self.curve.setData(t, v)
+
+    def showEvent(self, event):
+        self.update_plot()
+        self.refresh_timer.start()
+        QtWidgets.QWidget.showEvent(self, event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        QtWidgets.QWidget.hideEvent(self, event)
@@ -0,0 +1,70 @@
+"""
+Visibility tracking for attribute consumers.
+
+An attribute is only worth reading while at least one of the widgets showing it is mapped on
+screen, and nothing needs to be read while the window is minimised or hidden.
+
+:created: 2026-10-17
+"""
+
+from PyQt5 import QtCore
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VisibilityGate(QtCore.QObject):
+    """ Watches show/hide events of the consumer widgets of each attribute key and of the top
+    level window.
+
+    attr_visible_callback(attr_key, visible) is called when the visibility of an attribute changes.
+    paused_callback(paused) is called when the window is minimised/hidden or shown again.
+    Attribute keys without registered consumers are always considered visible.
+
+    """
+    def __init__(self, window, attr_visible_callback, paused_callback):
+        QtCore.QObject.__init__(self)
+        self.window = window
+        self.attr_visible_callback = attr_visible_callback
+        self.paused_callback = paused_callback
+        self.consumers = dict()
+        self.visible = dict()
+        self.paused = None
+        self.watched_events = [QtCore.QEvent.Show, QtCore.QEvent.Hide, QtCore.QEvent.WindowStateChange,
+                               QtCore.QEvent.ParentChange]
+        # Show/hide events arrive in bursts for all children of a widget, so re-evaluate once
+        # when the event loop is idle again.
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(0)
+        self.update_timer.timeout.connect(self.update_visibility)
+        self.window.installEventFilter(self)
+
+    def add_consumers(self, attr_key, widgets):
+        consumer_list = self.consumers.setdefault(attr_key, list())
+        for w in widgets:
+            if w not in consumer_list:
+                consumer_list.append(w)
+                w.installEventFilter(self)
+        self.update_timer.start()
+
+    def eventFilter(self, watched, event):
+        if event.type() in self.watched_events:
+            self.update_timer.start()
+        return False
+
+    def is_window_paused(self):
+        return not self.window.isVisible() or self.window.isMinimized()
+
+    def update_visibility(self):
+        paused = self.is_window_paused()
+        if paused != self.paused:
+            self.paused = paused
+            logger.debug("Window paused: {0}".format(paused))
+            self.paused_callback(paused)
+        for attr_key, widgets in self.consumers.items():
+            visible = any(w.isVisible() for w in widgets)
+            if visible != self.visible.get(attr_key):
+                self.visible[attr_key] = visible
+                logger.debug("{0} visible: {1}".format(attr_key, visible))
+                self.attr_visible_callback(attr_key, visible)
@@ -0,0 +1,76 @@
+"""
+Waterfall view of a spectrum over time.
+
+The last n_rows spectra are kept in a preallocated (2 * n_rows, n_columns) array. Each new
+spectrum is binned into a row and written twice, at row i and i + n_rows, so that the latest
+n_rows spectra always form one contiguous block of the buffer. That block is passed to the image
+item with a single setImage per update, without copying or rolling the buffer.
+
+:created: 2026-10-17
+"""
+
+from PyQt5 import QtCore, QtWidgets
+import logging
+import numpy as np
+import pyqtgraph as pg
+
+logger = logging.getLogger(__name__)
+
+
+class SpectrumWaterfall(QtWidgets.QWidget):
+    """ Waterfall of spectra cropped to x_range, newest spectrum at the top.
+
+    :param x_range: (x_min, x_max) shown on the x axis
+    :param n_rows: Number of spectra shown
+    :param n_columns: Number of x bins. Each bin shows the maximum of the spectrum points in it.
+    """
+    def __init__(self, x_range, n_rows=200, n_columns=300, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+        self.x_range = x_range
+        self.n_rows = n_rows
+        self.n_columns = n_columns
+        self.buffer = np.zeros((2 * n_rows, n_columns), dtype=np.float64)
+        self.row = 0
+        self.x = None
+        self.starts = None
+        self.end = None
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.hideAxis("left")
+        self.plot_widget.setMouseEnabled(False, False)
+        self.image_item = pg.ImageItem(axisOrder="row-major")
+        self.plot_widget.addItem(self.image_item)
+        self.image_item.setRect(QtCore.QRectF(x_range[0], 0, x_range[1] - x_range[0], n_rows))
+        self.plot_widget.setXRange(*x_range, padding=0)
+        self.plot_widget.setYRange(0, n_rows, padding=0)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.plot_widget)
+
+    def clear(self):
+        self.buffer[:] = 0.0
+        self.row = 0
+
+    def _set_x(self, x):
+        self.x = x
+        edges = np.linspace(self.x_range[0], self.x_range[1], self.n_columns + 1)
+        self.end = max(1, min(x.shape[0], np.searchsorted(x, edges[-1])))
+        self.starts = np.clip(np.searchsorted(x, edges[:-1]), 0, self.end - 1)
+        # Rows binned with another axis can not be compared
+        self.clear()
+
+    def add_spectrum(self, x, y):
+        """ Add spectrum y with x axis x (increasing) and redraw.
+
+        A new x axis object clears the waterfall.
+        """
+        if x is not self.x:
+            self._set_x(x)
+        if y.shape[0] != self.x.shape[0]:
+            return
+        row = self.buffer[self.row]
+        np.maximum.reduceat(y[:self.end], self.starts, out=row)
+        self.buffer[self.row + self.n_rows] = row
+        self.row = (self.row + 1) % self.n_rows
+        # Rows row .. row + n_rows - 1 are the latest spectra, oldest first
+        self.image_item.setImage(self.buffer[self.row:self.row + self.n_rows], autoLevels=True)